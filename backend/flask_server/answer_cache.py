@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.95))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 1000))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", 6 * 60 * 60))
+ANSWER_CACHE_MAX_BYTES = int(os.getenv("ANSWER_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+
+
+class SemanticAnswerCache:
+    """Caches LLM answers keyed on the question embedding.
+
+    A lookup hits when a stored question has cosine similarity >= threshold
+    with the new one. Entries are evicted least-recently-used once the entry
+    or byte cap is reached, and expire after ttl seconds. Everything is dropped
+    when the version of the source namespace changes.
+    """
+
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, max_entries=ANSWER_CACHE_MAX_ENTRIES,
+                 ttl=ANSWER_CACHE_TTL, max_bytes=ANSWER_CACHE_MAX_BYTES):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.namespace_version = None
+        self.lock = threading.Lock()
+        self._next_key = 0
+        self._keys = None
+        self._matrix = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _normalize(self, embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.total_bytes -= entry["size"]
+        self._matrix = None
+
+    def _expire(self, now):
+        expired = [key for key, entry in self.entries.items() if now - entry["created"] > self.ttl]
+        for key in expired:
+            self._remove(key)
+        self.evictions += len(expired)
+
+    def set_namespace_version(self, version):
+        """Drop all entries if the namespace the answers were built from has changed"""
+        with self.lock:
+            if self.namespace_version is not None and version != self.namespace_version:
+                self._clear()
+                self.invalidations += 1
+            self.namespace_version = version
+
+    def _clear(self):
+        self.entries.clear()
+        self.total_bytes = 0
+        self._matrix = None
+
+    def clear(self):
+        with self.lock:
+            self._clear()
+
+    def get(self, embedding):
+        query = self._normalize(embedding)
+        with self.lock:
+            self._expire(time.time())
+            if not self.entries:
+                self.misses += 1
+                return None
+
+            if self._matrix is None:
+                self._keys = list(self.entries)
+                self._matrix = np.stack([self.entries[key]["embedding"] for key in self._keys])
+            scores = self._matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            key = self._keys[best]
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]["answer"]
+
+    def put(self, embedding, answer):
+        if not answer:
+            return
+        vector = self._normalize(embedding)
+        size = vector.nbytes + len(answer.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            self.entries[self._next_key] = {
+                "embedding": vector,
+                "answer": answer,
+                "created": time.time(),
+                "size": size
+            }
+            self._next_key += 1
+            self.total_bytes += size
+            self._matrix = None
+
+            while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "namespace_version": self.namespace_version
+            }
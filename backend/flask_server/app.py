@@ -1,61 +1,243 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 from PyPDF2 import PdfReader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain.memory import ConversationBufferMemory
-from langchain.chains import ConversationalRetrievalChain
-from langchain_huggingface import HuggingFaceEndpoint, HuggingFaceEmbeddings
-from langchain_pinecone import PineconeVectorStore
-from pinecone import Pinecone
+from langchain_core.documents import Document
+import logging
 import os
+import sys
 import pandas as pd
-import re
+import time
+from streaming import AnswerStream, cached_answer_events, clean_response, sse_event
+from answer_cache import SemanticAnswerCache
+from components import ComponentRegistry
+from lawyer_store import LawyerStore
+from hybrid_retrieval import document_text, fuse_results
+from session_memory import SessionMemoryStore
+from document_registry import DocumentRegistry, chunk_id, fingerprint
+from context_packer import CONTEXT_CANDIDATES, CONTEXT_TOKEN_BUDGET, order_by_mmr, pack_context
+from metrics import (
+    ANSWER_CACHE,
+    REQUEST_ERRORS,
+    REQUEST_SECONDS,
+    REQUESTS_IN_FLIGHT,
+    RETRIEVAL_CACHE,
+    RETRIEVALS,
+    StageTimer,
+    registry as metrics_registry,
+)
+from single_flight import SingleFlight
+from retrieval_cache import RetrievalCache
+from tokens import count_tokens, normalize_question
+
+# Shared helpers from the ingest side (embedding cache, etc.)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data_preprocessing"))
+from embedding_cache import get_cached_embeddings
+from ingest import embed_and_upsert
+from local_vector_store import LocalVectorStore
+from bm25_index import load_bm25_indexes
+from namespace_generations import NamespaceGenerations
 app = Flask(__name__)
 CORS(app)
 
 load_dotenv()
+# Per-request timings are logged as one JSON line on the legal_compass.timing logger
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(name)s %(message)s")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 
-lawyer_data = pd.read_csv("../data/wills_lawyers.csv", encoding="utf-8")
+# VECTOR_BACKEND=local serves retrieval from an in-process index built by embedding.py
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", "../data/local_index")
+# Set WARM_UP=0 to load everything lazily on first use instead of in the background
+WARM_UP = os.getenv("WARM_UP", "1") != "0"
+LAWYER_DATA_PATH = "../data/wills_lawyers.csv"
+# BM25 indexes written by embedding.py, one <namespace>.jsonl per namespace
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", "../data/bm25_index")
+# Candidates taken from each retriever before fusing down to k
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", 10))
+# Set SESSION_SUMMARIZE=1 to fold old turns into an LLM-written summary instead of dropping them
+SESSION_SUMMARIZE = os.getenv("SESSION_SUMMARIZE", "0") == "1"
+
+# Components are loaded lazily (or by the warm-up thread) so importing the app stays cheap
+components = ComponentRegistry()
+
+def load_lawyer_store():
+    lawyer_data = pd.read_csv(LAWYER_DATA_PATH, encoding="utf-8")
+    return LawyerStore(lawyer_data, version=os.path.getmtime(LAWYER_DATA_PATH))
+
+def load_llm():
+    from langchain_huggingface import HuggingFaceEndpoint
+
+    return HuggingFaceEndpoint(
+        repo_id="mistralai/Mistral-7B-Instruct-v0.3",
+        task="text-generation",
+        temperature=0.1,
+        huggingfacehub_api_token=os.getenv("HUGGINGFACE_API_TOKEN"),
+        model_kwargs={
+            "max_length": 2048
+        }
+    )
+
+def load_embeddings():
+    return get_cached_embeddings()
+
+def load_index():
+    if VECTOR_BACKEND == "local":
+        # The local store also implements the index upsert/describe_index_stats calls
+        return LocalVectorStore.load(LOCAL_INDEX_PATH, components.get("embeddings"), text_key="chunk_text")
+
+    from pinecone import Pinecone
+
+    pc = Pinecone(api_key=PINECONE_API_KEY)
+    return pc.Index("legal-compass")
+
+def load_vectorstore():
+    if VECTOR_BACKEND == "local":
+        return components.get("index")
+
+    from langchain_pinecone import PineconeVectorStore
+
+    return PineconeVectorStore(
+        index=components.get("index"),
+        embedding=components.get("embeddings"),
+        text_key="chunk_text"
+    )
+
+def load_bm25():
+    indexes = load_bm25_indexes(BM25_INDEX_PATH)
+    for bm25_index in indexes.values():
+        bm25_index.build()
+    return indexes
+
+components.register("lawyer_store", load_lawyer_store)
+components.register("embeddings", load_embeddings)
+components.register("index", load_index)
+components.register("vectorstore", load_vectorstore)
+components.register("pdf_registry", DocumentRegistry)
+components.register("bm25", load_bm25)
+# Write counters bumped by every upsert (here and in embedding.py), which invalidate cached retrievals
+components.register("generations", NamespaceGenerations)
+components.register("retrieval_cache", lambda: RetrievalCache(components.get("generations")))
+components.register("llm", load_llm)
+# What /ask needs to answer; the rest load quickly on first use and don't hold up readiness
+READY_COMPONENTS = ("embeddings", "index", "llm")
+
+def get_lawyer_store():
+    store = components.get("lawyer_store")
+    # Rebuild the pre-serialized records when the CSV is replaced on disk
+    if os.path.getmtime(LAWYER_DATA_PATH) != store.version:
+        components.reset("lawyer_store")
+        store = components.get("lawyer_store")
+    return store
+
+def parse_non_negative_int(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    if not value.isdigit():
+        raise ValueError(f"{name} must be a non-negative integer")
+    return int(value)
 
 @app.route("/lawyers", methods = ["GET"])
 def get_will_lawyers():
-    result = lawyer_data.to_dict(orient = "records")
-    return jsonify(result)
+    store = get_lawyer_store()
+    try:
+        limit = parse_non_negative_int("limit")
+        offset = parse_non_negative_int("offset") or 0
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    fields = [field.strip() for field in request.args.get("fields", "").split(",") if field.strip()] or None
+    unknown = [field for field in fields or [] if field not in store.columns]
+    if unknown:
+        return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    timer = StageTimer("/lawyers")
+    with timer.stage("page"):
+        page = store.page(category=request.args.get("category"), offset=offset, limit=limit, fields=fields)
+    with timer.stage("response"):
+        response = store.response(page, request)
+    timer.log(total_count=page["total"], status=response.status_code)
+    return response
+
+MAX_NEARBY_RESULTS = 100
+
+@app.route("/lawyers/nearby", methods=["GET"])
+def get_nearby_lawyers():
+    try:
+        lat = float(request.args["lat"])
+        lng = float(request.args["lng"])
+        radius = float(request.args["radius"]) if "radius" in request.args else None
+        k = int(request.args.get("k", 10))
+    except KeyError as e:
+        return jsonify({"error": f"Missing parameter: {e.args[0]}"}), 400
+    except ValueError:
+        return jsonify({"error": "lat, lng, radius and k must be numbers"}), 400
+
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return jsonify({"error": "lat/lng out of range"}), 400
+    if radius is not None and radius <= 0:
+        return jsonify({"error": "radius must be positive"}), 400
+    if not 1 <= k <= MAX_NEARBY_RESULTS:
+        return jsonify({"error": f"k must be between 1 and {MAX_NEARBY_RESULTS}"}), 400
+
+    # radius is in kilometres; distances come back as distance_km on each record
+    results = get_lawyer_store().nearby(lat, lng, k=k, radius_km=radius, category=request.args.get("category"))
+    return jsonify(results)
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    # Liveness only: the process is up and serving requests
+    return jsonify({"status": "ok"})
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    status = components.status()
+    # Without warm-up everything loads on first use, so there is nothing to wait for
+    ready = not WARM_UP or all(status[name]["ready"] for name in READY_COMPONENTS)
+    return jsonify({"ready": ready, "components": status}), 200 if ready else 503
+
+def route_label():
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    REQUESTS_IN_FLIGHT.inc(route=route_label())
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(metrics_registry.render(), mimetype="text/plain; version=0.0.4")
+
+def finish_request_metrics(route, request_start):
+    REQUESTS_IN_FLIGHT.dec(route=route)
+    REQUEST_SECONDS.observe(time.perf_counter() - request_start, route=route)
 
 @app.after_request
 def after_request(response):
+    route = route_label()
+    # /readyz answers 503 on purpose while components load; that isn't a failure
+    if response.status_code >= 500 and route != "/readyz":
+        REQUEST_ERRORS.inc(route=route)
+    # Popped so teardown_request_metrics knows this request is already accounted for
+    request_start = g.pop("request_start", None)
+    if request_start is not None:
+        # Runs once the body has been sent, so streamed answers are timed to their last event
+        response.call_on_close(lambda: finish_request_metrics(route, request_start))
     response.headers.add("Access-Control-Allow-Origin", "*")
     response.headers.add("Access-Control-Allow-Methods", "GET,POST,OPTIONS")
     response.headers.add("Access-Control-Allow-Headers", "Content-Type,Authorization")
     return response
 
-# Initialize components at startup
-llm = HuggingFaceEndpoint(
-    repo_id="mistralai/Mistral-7B-Instruct-v0.3",
-    task="text-generation",
-    temperature=0.1,
-    huggingfacehub_api_token=os.getenv("HUGGINGFACE_API_TOKEN"),
-    model_kwargs={
-        "max_length": 2048
-    }
-)
-
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-conversation_chain = None
-vectorstore = None
-
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index("legal-compass") 
-
-
-persistent_vectorstore = PineconeVectorStore(
-    index=index,
-    embedding=embeddings,
-    text_key="chunk_text"
-)
+@app.teardown_request
+def teardown_request_metrics(exc):
+    # after_request is skipped when an exception propagates (e.g. debug mode), so settle the request here
+    request_start = g.pop("request_start", None)
+    if request_start is not None:
+        route = route_label()
+        REQUEST_ERRORS.inc(route=route)
+        finish_request_metrics(route, request_start)
 
 
 def get_pdf_text(pdf_docs):
@@ -76,94 +258,205 @@ def get_text_chunks(text):
     )
     return splitter.split_text(text)
 
-def get_conversation_chain(vectorstore=None):
-    memory = ConversationBufferMemory(
-        memory_key='chat_history',
-        return_messages=True,
-        output_key='answer'
-    )
-    
-    retriever = (vectorstore if vectorstore else persistent_vectorstore).as_retriever(
-        search_type="similarity",
-        search_kwargs={"k": 4}
-    )
-    
-    return ConversationalRetrievalChain.from_llm(
-        llm=llm,
-        retriever=retriever,
-        memory=memory,
-        return_source_documents=True
-    )
-
-# Initialize conversation chain
-conversation_chain = get_conversation_chain(persistent_vectorstore)
-
 @app.route('/process-pdf', methods=['POST'])
 def process_pdf():
     if 'pdf' not in request.files:
         return jsonify({'error': 'No PDF provided'}), 400
     
     try:
+        start = time.perf_counter()
+        timer = StageTimer("/process-pdf")
+        pdf = request.files['pdf']
+        namespace = "user_pdf"
+        registry = components.get("pdf_registry")
+        # Earlier uploads are kept unless the client names the document_id this one replaces
+        replaces = request.form.get('replaces')
+        previous = registry.get(replaces) if replaces else None
+        if replaces and previous is None:
+            return jsonify({'error': f'Unknown document_id to replace: {replaces}'}), 404
+
+        # 0. Skip documents that are already indexed
+        pdf_bytes = pdf.read()
+        pdf.stream.seek(0)
+        document_id = fingerprint(pdf_bytes)
+        existing = registry.get(document_id)
+        if existing:
+            # Content that is already indexed can still stand in for the document it replaces
+            stale_ids = registry.remove(previous['fingerprint']) if previous and previous['fingerprint'] != document_id else []
+            if stale_ids:
+                components.get("index").delete(ids=stale_ids, namespace=namespace)
+                components.get("generations").bump(namespace)
+            timer.log(status='already_indexed', document_id=document_id, deleted=len(stale_ids))
+            return jsonify({
+                'status': 'already_indexed',
+                'document_id': document_id,
+                'chunks_processed': existing['chunk_count'],
+                'chunks_embedded': 0,
+                'chunks_deleted': len(stale_ids),
+                'timings': {'total': round(time.perf_counter() - start, 4)}
+            })
+
         # 1. Extract text
-        pdf_text = get_pdf_text([request.files['pdf']])
+        pdf_text = get_pdf_text([pdf])
+        extract_time = time.perf_counter() - start
+        timer.record('extract', extract_time)
         
-        # 2. Create chunks
+        # 2. Create chunks with content-derived IDs
+        chunk_start = time.perf_counter()
         text_chunks = get_text_chunks(pdf_text)
+        chunks_by_id = {}
+        for chunk in text_chunks:
+            chunks_by_id.setdefault(chunk_id(chunk), chunk)
+        chunk_time = time.perf_counter() - chunk_start
+        timer.record('chunk', chunk_time)
         
-        # 3. Create embeddings and upsert to Pinecone
-        vectors = []
-        namespace = "user_pdf"
-        for i, chunk in enumerate(text_chunks):
-            vector = embeddings.embed_query(chunk)
-            vectors.append({
-                'id': f"chunk_{i}",
+        # 3. Embed and upsert only chunks that no indexed document already has
+        known_ids = registry.known_chunk_ids(chunks_by_id)
+        new_ids = [cid for cid in chunks_by_id if cid not in known_ids]
+
+        def build_vector(i, chunk, vector):
+            return {
+                'id': new_ids[i],
                 'values': vector,
                 'metadata': {
                     'chunk_text': chunk,
-                    'source': request.files['pdf'].filename
+                    'source': pdf.filename
                 }
-            })
-        index.upsert(vectors=vectors, namespace=namespace)
-        # Update the conversation chain
-        global conversation_chain, vectorstore
-        conversation_chain = get_conversation_chain(persistent_vectorstore)
-        
+            }
+
+        index = components.get("index")
+        new_chunks = [chunks_by_id[cid] for cid in new_ids]
+        timings = embed_and_upsert(new_chunks, components.get("embeddings"), index, namespace, build_vector)
+        timer.record('embed', timings['embed'])
+        timer.record('upsert', timings['upsert'])
+        registry.register(document_id, pdf.filename, list(chunks_by_id))
+
+        # 4. The document this one replaces gives up the chunks only it used
+        stale_ids = registry.remove(previous['fingerprint']) if previous else []
+        if stale_ids:
+            index.delete(ids=stale_ids, namespace=namespace)
+        if new_ids or stale_ids:
+            components.get("generations").bump(namespace)
+
+        timer.log(status='success', document_id=document_id, chunks=len(text_chunks),
+                  embedded=len(new_ids), deleted=len(stale_ids))
         return jsonify({
             'status': 'success',
-            'chunks_processed': len(text_chunks)
+            'document_id': document_id,
+            'chunks_processed': len(text_chunks),
+            'chunks_embedded': len(new_ids),
+            'chunks_reused': len(chunks_by_id) - len(new_ids),
+            'chunks_deleted': len(stale_ids),
+            'timings': {
+                'extract': round(extract_time, 4),
+                'chunk': round(chunk_time, 4),
+                'embed': round(timings['embed'], 4),
+                'upsert': round(timings['upsert'], 4),
+                'total': round(time.perf_counter() - start, 4)
+            }
         })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def format_chunks(chunks, max_chars=1500):
-    formatted = []
-    total_chars = 0
-    for doc in chunks:
-        text = doc.metadata.get("chunk_text", "")
-        if text:
-            source = doc.metadata.get("source", "unknown")
-            chunk_text = f"Source: {source}\n{text}"
-            if total_chars + len(chunk_text) <= max_chars:
-                formatted.append(chunk_text)
-                total_chars += len(chunk_text)
-    return "\n\n".join(formatted)
+# Must match the namespace the ingest scripts wrote to (their LEGAL_NAMESPACE)
+LEGAL_NAMESPACE = os.getenv("LEGAL_NAMESPACE", "california_law_code")
 
+answer_cache = SemanticAnswerCache()
 
-    
+def refresh_answer_cache_version():
+    # Cached answers are dropped whenever an ingest writes to the legal namespace
+    answer_cache.set_namespace_version(components.get("generations").get(LEGAL_NAMESPACE))
 
-@app.route("/ask", methods=["POST"])
-def ask():
-    user_question = request.json["question"]
-    
-    # Step 1: Search legal info
-    legal_chunks = persistent_vectorstore.similarity_search(user_question, namespace="california_law_code", k=3)
-    
-    # Step 2: Check if legal_chunks are empty or lack valid content
+def summarize_turns(summary, turns):
+    conversation = "\n".join(f"User: {turn['question']}\nAssistant: {turn['answer']}" for turn in turns)
+    prompt = f"""
+        Summarize the following conversation between a user and a legal assistant in two or three sentences.
+        Keep names, amounts, dates and the legal topics discussed.
+
+        Earlier Summary:
+        {summary or "None"}
+
+        Conversation:
+        {conversation}
+        """
+    return clean_response(components.get("llm").invoke(prompt))
+
+session_store = SessionMemoryStore(summarize=summarize_turns if SESSION_SUMMARIZE else None)
+
+def search_legal_vectors(query_embedding, k):
+    """Vector search returning the docs plus each match's stored vector, keyed by chunk text.
+
+    Pinecone and the local index both return the vectors with the matches, so
+    MMR can rank the candidates without embedding them again.
+    """
+    response = components.get("index").query(
+        vector=[float(x) for x in query_embedding],
+        top_k=k,
+        namespace=LEGAL_NAMESPACE,
+        include_values=True,
+        include_metadata=True
+    )
+    docs = []
+    vectors = {}
+    for match in response.matches:
+        metadata = dict(match.metadata or {})
+        doc = Document(id=match.id, page_content=metadata.get("chunk_text", ""), metadata=metadata)
+        docs.append(doc)
+        vectors[document_text(doc)] = match.values
+    return docs, vectors
+
+def fetch_missing_vectors(docs, chunk_vectors):
+    """Fetch the stored vectors of docs only BM25 found, so MMR can rank every candidate"""
+    missing = {doc.id: document_text(doc) for doc in docs if doc.id and document_text(doc) not in chunk_vectors}
+    if missing:
+        response = components.get("index").fetch(ids=list(missing), namespace=LEGAL_NAMESPACE)
+        for vector_id, vector in response.vectors.items():
+            chunk_vectors[missing[vector_id]] = vector.values
+    return chunk_vectors
+
+def retrieve_legal_chunks(user_question, k=CONTEXT_CANDIDATES, query_embedding=None):
+    retrieval_cache = components.get("retrieval_cache")
+    cached_docs = retrieval_cache.get(LEGAL_NAMESPACE, user_question, k)
+    if cached_docs is not None:
+        RETRIEVAL_CACHE.inc(result="hit")
+        RETRIEVALS.inc(result="hit" if cached_docs else "empty")
+        return cached_docs
+    RETRIEVAL_CACHE.inc(result="miss")
+    # Read before querying, so an upsert that lands mid-query leaves the entry stale
+    generation = components.get("generations").get(LEGAL_NAMESPACE)
+
+    bm25_index = components.get("bm25").get(LEGAL_NAMESPACE)
+    # With a BM25 index, take a wider candidate set from both and fuse down to k
+    vector_k = max(k, HYBRID_CANDIDATES) if bm25_index else k
+
+    if query_embedding is not None:
+        vector_docs, chunk_vectors = search_legal_vectors(query_embedding, vector_k)
+    else:
+        vector_docs = components.get("vectorstore").similarity_search(user_question, namespace=LEGAL_NAMESPACE, k=vector_k)
+        chunk_vectors = {}
+
+    if bm25_index:
+        lexical_results = bm25_index.search(user_question, k=HYBRID_CANDIDATES)
+        vector_docs = fuse_results(vector_docs, lexical_results, k)
+        if query_embedding is not None:
+            chunk_vectors = fetch_missing_vectors(vector_docs, chunk_vectors)
+    # Cached in MMR order, so the order doesn't need the vectors again
+    vector_docs = order_by_mmr(vector_docs, query_embedding, chunk_vectors)
+    RETRIEVALS.inc(result="hit" if vector_docs else "empty")
+    retrieval_cache.put(LEGAL_NAMESPACE, user_question, k, vector_docs, generation)
+    return vector_docs
+
+def build_prompt(user_question, legal_chunks, history=""):
+    history_block = f"""
+        Conversation So Far:
+        {history}
+        """ if history else ""
+    # Check if legal_chunks are empty or lack valid content
     if legal_chunks and any(doc.metadata.get("chunk_text", "") for doc in legal_chunks):
-        legal_context = format_chunks(legal_chunks)
+        legal_context = pack_context(legal_chunks)
         # Prompt with legal context
-        context = f"""
+        return f"""
         You are a helpful and professional legal assistant with knowledge of federal and California law.
 
         Use the provided legal context to inform your answer.
@@ -175,12 +468,12 @@ def ask():
         Legal Context:
         {legal_context}
 
+        {history_block}
         User Question:
         {user_question}
         """
-    else:
-        # Prompt without legal context
-        context = f"""
+    # Prompt without legal context
+    return f"""
         You are a helpful and professional legal assistant with knowledge of federal and California law.
 
         No specific legal texts were retrieved. Provide a general explanation based on standard California trust and probate law.
@@ -189,20 +482,149 @@ def ask():
 
         Only quote short parts of the law if absolutely necessary to support your explanation. Otherwise, focus on providing a useful, easy-to-understand answer.
 
+        {history_block}
         User Question:
         {user_question}
         """
+
+def lookup_cached_answer(question_embedding, history):
+    # Answers that depend on earlier turns are never served from (or stored in) the cache
+    if history:
+        ANSWER_CACHE.inc(result="bypass")
+        return None
+    refresh_answer_cache_version()
+    cached_response = answer_cache.get(question_embedding)
+    ANSWER_CACHE.inc(result="miss" if cached_response is None else "hit")
+    return cached_response
+
+def record_answer(user_question, answer, question_embedding, history, session_id=None, cached=False):
+    if not cached and not history:
+        answer_cache.put(question_embedding, answer)
+    if session_id:
+        session_store.add_turn(session_id, user_question, answer)
+
+def question_key(user_question):
+    # Identical questions against the same retrieval settings get the same answer
+    return (normalize_question(user_question), LEGAL_NAMESPACE, CONTEXT_CANDIDATES, CONTEXT_TOKEN_BUDGET)
+
+def answer_question(user_question, history, timer):
+    # Step 0: Answer from the semantic cache when a near-identical question was seen
+    with timer.stage("embed_query"):
+        question_embedding = components.get("embeddings").embed_query(user_question)
+    with timer.stage("cache_lookup"):
+        cached_response = lookup_cached_answer(question_embedding, history)
+    if cached_response is not None:
+        return {"response": cached_response, "question_embedding": question_embedding, "cached": True}
+    
+    # Step 1: Search legal info
+    with timer.stage("retrieval"):
+        legal_chunks = retrieve_legal_chunks(user_question, query_embedding=question_embedding)
+    
+    # Step 2: Build prompt with or without legal context
+    with timer.stage("prompt"):
+        context = build_prompt(user_question, legal_chunks, history)
     
     # Step 3: Call LLM
-    response = llm.invoke(context)
-    print("Raw Response:", response)
+    with timer.stage("llm"):
+        response = components.get("llm").invoke(context)
     
     # Step 4: Clean response
-    cleaned_response = re.sub(r'^-+\n*|\n*-+$', '', response).strip()
-    print("Cleaned Response:", cleaned_response)
+    return {
+        "response": clean_response(response),
+        "question_embedding": question_embedding,
+        "cached": False,
+        "chunks": len(legal_chunks),
+        "prompt_tokens": count_tokens(context)
+    }
+
+ask_flight = SingleFlight()
+
+@app.route("/ask", methods=["POST"])
+def ask():
+    user_question = request.json["question"]
+    session_id = request.json.get("session_id")
+    history = session_store.history(session_id) if session_id else ""
+    timer = StageTimer("/ask")
+
+    # Concurrent identical questions share one retrieval and LLM call; answers that
+    # depend on conversation history are always computed on their own
+    if history:
+        answer, shared = answer_question(user_question, history, timer), False
+    else:
+        answer, shared = ask_flight.do(question_key(user_question),
+                                       lambda: answer_question(user_question, history, timer))
+
+    # Only the request that computed a fresh answer stores it in the answer cache
+    record_answer(user_question, answer["response"], answer["question_embedding"], history, session_id,
+                  cached=answer["cached"] or shared)
+    timer.log(cached=answer["cached"], shared=shared, chunks=answer.get("chunks"),
+              prompt_tokens=answer.get("prompt_tokens"), response_chars=len(answer["response"]))
     
     # Step 5: Return the cleaned response
-    return jsonify({"response": cleaned_response})
+    return jsonify({"response": answer["response"], "cached": answer["cached"]})
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify({**answer_cache.stats(), "retrieval": components.get("retrieval_cache").stats()})
+
+@app.route("/sessions/<session_id>", methods=["DELETE"])
+def clear_session(session_id):
+    session_store.clear(session_id)
+    return jsonify({"status": "cleared"})
+
+@app.route("/ask/stream", methods=["POST"])
+def ask_stream():
+    user_question = request.json["question"]
+    session_id = request.json.get("session_id")
+    history = session_store.history(session_id) if session_id else ""
+    start = time.perf_counter()
+    timer = StageTimer("/ask/stream")
+
+    with timer.stage("embed_query"):
+        question_embedding = components.get("embeddings").embed_query(user_question)
+    with timer.stage("cache_lookup"):
+        cached_response = lookup_cached_answer(question_embedding, history)
+
+    # Retrieval happens before the stream starts so errors still return a normal response
+    if cached_response is None:
+        with timer.stage("retrieval"):
+            legal_chunks = retrieve_legal_chunks(user_question, query_embedding=question_embedding)
+        with timer.stage("prompt"):
+            context = build_prompt(user_question, legal_chunks, history)
+    retrieval_time = time.perf_counter() - start
+
+    def generate_cached():
+        record_answer(user_question, cached_response, question_embedding, history, session_id, cached=True)
+        yield from cached_answer_events(cached_response, start, retrieval_time)
+        timer.log(cached=True)
+
+    def generate():
+        stream = AnswerStream(start, retrieval_time)
+        yield from stream.opening()
+        try:
+            with timer.stage("llm"):
+                for token in components.get("llm").stream(context):
+                    yield from stream.token(token)
+            final_events = stream.finish()
+        except Exception as e:
+            REQUEST_ERRORS.inc(route="/ask/stream")
+            timer.log(cached=False, error=str(e))
+            yield sse_event({"error": str(e)}, event="error")
+            return
+
+        record_answer(user_question, stream.response, question_embedding, history, session_id)
+        timer.log(cached=False, chunks=len(legal_chunks), prompt_tokens=count_tokens(context),
+                  response_chars=len(stream.response))
+        yield from final_events
+
+    stream = generate_cached() if cached_response is not None else generate()
+    response = Response(stream_with_context(stream), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+if WARM_UP:
+    components.warm_up()
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,182 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.wsgi import WsgiToAsgi
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+from app import (
+    app as flask_app,
+    build_prompt,
+    clean_response,
+    components,
+    lookup_cached_answer,
+    question_key,
+    record_answer,
+    retrieve_legal_chunks,
+    session_store,
+)
+from context_packer import CONTEXT_CANDIDATES
+from metrics import REQUEST_ERRORS, StageTimer, track_request
+from single_flight import AsyncSingleFlight
+from streaming import AnswerStream, cached_answer_events, sse_event
+
+# Async serving mode: run with `uvicorn asgi:app` from this folder.
+# /ask and /ask/stream await the LLM without holding a thread; every other route
+# is served by the Flask app unchanged.
+
+# CPU-bound embedding runs in a small pool so it can't starve the event loop
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", 2))
+# Pinecone's client is blocking, so retrieval gets its own larger pool
+IO_WORKERS = int(os.getenv("IO_WORKERS", 32))
+
+embed_executor = ThreadPoolExecutor(max_workers=EMBED_WORKERS, thread_name_prefix="embed")
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type,Authorization"
+}
+
+
+async def run_in(executor, func, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+
+async def get_component(name):
+    if components.is_ready(name):
+        return components.get(name)
+    return await run_in(io_executor, components.get, name)
+
+
+async def prepare_question(user_question, history, timer):
+    """Embed the question, check the answer cache and, on a miss, retrieve and build the prompt"""
+    with timer.stage("embed_query"):
+        embeddings = await get_component("embeddings")
+        question_embedding = await run_in(embed_executor, embeddings.embed_query, user_question)
+
+    with timer.stage("cache_lookup"):
+        cached_response = await run_in(io_executor, lookup_cached_answer, question_embedding, history)
+    if cached_response is not None:
+        return question_embedding, cached_response, None
+
+    with timer.stage("retrieval"):
+        legal_chunks = await run_in(io_executor, retrieve_legal_chunks, user_question, CONTEXT_CANDIDATES, question_embedding)
+    # Packing is plain string work on at most CONTEXT_CANDIDATES chunks, so it runs on the loop
+    with timer.stage("prompt"):
+        context = build_prompt(user_question, legal_chunks, history)
+    return question_embedding, None, context
+
+
+async def answer_question(user_question, history, timer):
+    question_embedding, cached_response, context = await prepare_question(user_question, history, timer)
+    if cached_response is not None:
+        return {"response": cached_response, "question_embedding": question_embedding, "cached": True}
+
+    with timer.stage("llm"):
+        llm = await get_component("llm")
+        response = await llm.ainvoke(context)
+    return {"response": clean_response(response), "question_embedding": question_embedding, "cached": False}
+
+
+ask_flight = AsyncSingleFlight()
+
+
+async def ask(request):
+    if request.method == "OPTIONS":
+        return Response(status_code=204, headers=CORS_HEADERS)
+    payload = await request.json()
+    user_question = payload["question"]
+    session_id = payload.get("session_id")
+    history = session_store.history(session_id) if session_id else ""
+    timer = StageTimer("/ask")
+
+    with track_request("/ask"):
+        if history:
+            answer, shared = await answer_question(user_question, history, timer), False
+        else:
+            answer, shared = await ask_flight.do(question_key(user_question),
+                                                 lambda: answer_question(user_question, history, timer))
+        await run_in(io_executor, record_answer, user_question, answer["response"], answer["question_embedding"],
+                     history, session_id, answer["cached"] or shared)
+        timer.log(cached=answer["cached"], shared=shared, response_chars=len(answer["response"]))
+        return JSONResponse({"response": answer["response"], "cached": answer["cached"]}, headers=CORS_HEADERS)
+
+
+async def ask_stream(request):
+    if request.method == "OPTIONS":
+        return Response(status_code=204, headers=CORS_HEADERS)
+    payload = await request.json()
+    user_question = payload["question"]
+    session_id = payload.get("session_id")
+    history = session_store.history(session_id) if session_id else ""
+    start = time.perf_counter()
+    timer = StageTimer("/ask/stream")
+
+    # Covers the work before the stream starts; the stream itself is timed as the llm stage
+    with track_request("/ask/stream"):
+        question_embedding, cached_response, context = await prepare_question(user_question, history, timer)
+        retrieval_time = time.perf_counter() - start
+        llm = await get_component("llm") if cached_response is None else None
+
+    async def generate():
+        if cached_response is not None:
+            # May summarize older turns with the LLM, so it stays off the event loop
+            await run_in(io_executor, record_answer, user_question, cached_response, question_embedding,
+                         history, session_id, True)
+            for event in cached_answer_events(cached_response, start, retrieval_time):
+                yield event
+            timer.log(cached=True)
+            return
+
+        stream = AnswerStream(start, retrieval_time)
+        for event in stream.opening():
+            yield event
+        try:
+            with timer.stage("llm"):
+                async for token in llm.astream(context):
+                    for event in stream.token(token):
+                        yield event
+            final_events = stream.finish()
+        except Exception as e:
+            REQUEST_ERRORS.inc(route="/ask/stream")
+            timer.log(cached=False, error=str(e))
+            yield sse_event({"error": str(e)}, event="error")
+            return
+
+        await run_in(io_executor, record_answer, user_question, stream.response, question_embedding, history, session_id)
+        timer.log(cached=False, response_chars=len(stream.response))
+        for event in final_events:
+            yield event
+
+    headers = {**CORS_HEADERS, "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(generate(), media_type="text/event-stream", headers=headers)
+
+
+def close_response(wsgi_app):
+    """WSGI middleware that closes the response once its body has been sent.
+
+    WsgiToAsgi never calls close(), which is where the Flask app records
+    request latency and drops the in-flight gauge.
+    """
+    def closing_app(environ, start_response):
+        response = wsgi_app(environ, start_response)
+        # A plain loop rather than yield from, which would also close response on early exit
+        try:
+            for chunk in response:
+                yield chunk
+        finally:
+            if hasattr(response, "close"):
+                response.close()
+    return closing_app
+
+
+app = Starlette(routes=[
+    Route("/ask", ask, methods=["POST", "OPTIONS"]),
+    Route("/ask/stream", ask_stream, methods=["POST", "OPTIONS"]),
+    Mount("/", app=WsgiToAsgi(close_response(flask_app))),
+])
@@ -0,0 +1,82 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger("legal_compass.timing")
+
+
+class ComponentRegistry:
+    """Loads heavy app components on first use or from a background warm-up thread.
+
+    Each component is built by a factory at most once (per reset), and its
+    load time or error is kept for the readiness probe.
+    """
+
+    def __init__(self):
+        self.factories = {}
+        self.order = []
+        self.values = {}
+        self.locks = {}
+        self.loading = set()
+        self.load_times = {}
+        self.errors = {}
+
+    def register(self, name, factory):
+        self.factories[name] = factory
+        self.locks[name] = threading.Lock()
+        self.order.append(name)
+
+    def get(self, name):
+        if name in self.values:
+            return self.values[name]
+        with self.locks[name]:
+            if name in self.values:
+                return self.values[name]
+            self.loading.add(name)
+            start = time.perf_counter()
+            try:
+                value = self.factories[name]()
+            except Exception as e:
+                self.errors[name] = str(e)
+                raise
+            finally:
+                self.loading.discard(name)
+            self.load_times[name] = time.perf_counter() - start
+            self.errors.pop(name, None)
+            self.values[name] = value
+            return value
+
+    def set(self, name, value):
+        with self.locks[name]:
+            self.values[name] = value
+
+    def reset(self, name):
+        with self.locks[name]:
+            self.values.pop(name, None)
+
+    def is_ready(self, name):
+        return name in self.values
+
+    def warm_up(self, names=None):
+        def run():
+            for name in names or self.order:
+                try:
+                    self.get(name)
+                    logger.info("Loaded %s in %.2fs", name, self.load_times[name])
+                except Exception as e:
+                    logger.error("Failed to load %s: %s", name, e)
+
+        thread = threading.Thread(target=run, name="component-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self):
+        return {
+            name: {
+                "ready": name in self.values,
+                "loading": name in self.loading,
+                "load_time": round(self.load_times[name], 4) if name in self.load_times else None,
+                "error": self.errors.get(name)
+            }
+            for name in self.order
+        }
@@ -0,0 +1,125 @@
+import os
+
+import numpy as np
+
+from hybrid_retrieval import document_text
+from tokens import count_tokens, truncate_to_tokens
+
+# Prompt tokens spent on legal context (the old 1500-character cap was roughly 375)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 400))
+# Retrieved chunks the packer chooses from
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", 10))
+# 1.0 ranks purely by relevance, lower values favour chunks unlike those already picked
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", 0.7))
+# A chunk that doesn't fit is trimmed to the remaining budget if at least this much is left
+MIN_TRIM_TOKENS = 40
+# get_text_chunks() overlaps neighbouring chunks by up to 50 characters
+MAX_OVERLAP_CHARS = 100
+MIN_OVERLAP_CHARS = 20
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+def mmr_order(query_embedding, chunk_embeddings, mmr_lambda=MMR_LAMBDA):
+    """Order chunk indexes by maximal marginal relevance to the query"""
+    query = _normalize(query_embedding)
+    chunks = _normalize(chunk_embeddings)
+    relevance = chunks @ query
+    similarity = chunks @ chunks.T
+
+    order = []
+    remaining = list(range(len(chunks)))
+    while remaining:
+        if order:
+            redundancy = similarity[np.ix_(remaining, order)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining))
+        scores = mmr_lambda * relevance[remaining] - (1 - mmr_lambda) * redundancy
+        order.append(remaining.pop(int(np.argmax(scores))))
+    return order
+
+
+def merge_overlap(first, second):
+    """Join two chunks if one ends with the start of the other; returns None if they don't overlap"""
+    if second in first:
+        return first
+    if first in second:
+        return second
+    for a, b in ((first, second), (second, first)):
+        for size in range(min(MAX_OVERLAP_CHARS, len(a), len(b)), MIN_OVERLAP_CHARS - 1, -1):
+            if a.endswith(b[:size]):
+                return a + b[size:]
+    return None
+
+
+def order_by_mmr(docs, query_embedding, chunk_vectors, mmr_lambda=MMR_LAMBDA):
+    """Reorder retrieved docs by MMR using their stored vectors, keyed by chunk text.
+
+    The vectors come back with the search (or are fetched by ID for chunks
+    only BM25 found), so nothing is embedded here. A doc whose vector is still
+    missing keeps its place, and the docs around it are ordered by MMR.
+    """
+    if query_embedding is None or len(docs) < 2:
+        return docs
+    vectors = [chunk_vectors.get(document_text(doc)) for doc in docs]
+    ranked = [i for i, vector in enumerate(vectors) if vector is not None and len(vector) > 0]
+    if len(ranked) < 2:
+        return docs
+    ordered = list(docs)
+    for slot, i in zip(ranked, mmr_order(query_embedding, [vectors[i] for i in ranked], mmr_lambda)):
+        ordered[slot] = docs[ranked[i]]
+    return ordered
+
+
+def pack_context(chunks, token_budget=CONTEXT_TOKEN_BUDGET):
+    """Build the legal context block for the prompt from retrieved chunks.
+
+    Chunks are taken in the order given (see order_by_mmr), neighbouring
+    chunks from the same source and page are merged so their overlap is only
+    sent once, and the result is packed into token_budget, trimming the last
+    chunk instead of dropping it.
+    """
+    chunks = [doc for doc in chunks if document_text(doc)]
+    if not chunks:
+        return ""
+
+    # Each entry is [source, page, text]; chunks keep their selection order
+    entries = []
+    for doc in chunks:
+        source = doc.metadata.get("source", "unknown")
+        page = doc.metadata.get("page")
+        text = document_text(doc)
+        for entry in entries:
+            if entry[0] == source and entry[1] == page and page is not None:
+                merged = merge_overlap(entry[2], text)
+                if merged is not None:
+                    entry[2] = merged
+                    break
+        else:
+            entries.append([source, page, text])
+
+    # Consecutive entries from the same source share one header
+    formatted = []
+    used = 0
+    last_source = None
+    for source, _, text in entries:
+        header = f"Source: {source}\n" if source != last_source else ""
+        block = header + text
+        tokens = count_tokens(block)
+        if used + tokens > token_budget:
+            remaining = token_budget - used - count_tokens(header)
+            if remaining >= MIN_TRIM_TOKENS:
+                trimmed = truncate_to_tokens(text, remaining)
+                # Header and text are estimated separately, so together they can round one token over
+                if count_tokens(header + trimmed) > token_budget - used:
+                    trimmed = truncate_to_tokens(trimmed, remaining - 1)
+                formatted.append(header + trimmed)
+            break
+        formatted.append(block)
+        used += tokens
+        last_source = source
+    return "\n\n".join(formatted)
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+PDF_REGISTRY_PATH = os.getenv("PDF_REGISTRY_PATH", "../data/pdf_registry.sqlite")
+# SQLite limits the number of bound parameters per statement
+QUERY_BATCH_SIZE = 500
+
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def chunk_id(text):
+    return "chunk_" + hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+class DocumentRegistry:
+    """Tracks which uploaded documents are indexed and which chunk IDs they own.
+
+    Documents are keyed by a hash of the file bytes and chunks by a hash of
+    their text, so identical uploads and unchanged chunks can be skipped.
+    """
+
+    def __init__(self, path=PDF_REGISTRY_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL;")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    fingerprint TEXT PRIMARY KEY,
+                    filename TEXT,
+                    chunk_count INTEGER,
+                    indexed_at REAL
+                );
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS document_chunks (
+                    fingerprint TEXT,
+                    chunk_id TEXT,
+                    PRIMARY KEY (fingerprint, chunk_id)
+                );
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_document_chunks_chunk ON document_chunks (chunk_id);")
+            self.conn.commit()
+
+    def _document(self, row):
+        if row is None:
+            return None
+        doc_fingerprint, filename, chunk_count, indexed_at = row
+        chunk_ids = [r[0] for r in self.conn.execute(
+            "SELECT chunk_id FROM document_chunks WHERE fingerprint = ?;", (doc_fingerprint,)
+        )]
+        return {
+            "fingerprint": doc_fingerprint,
+            "filename": filename,
+            "chunk_count": chunk_count,
+            "chunk_ids": chunk_ids,
+            "indexed_at": indexed_at
+        }
+
+    def get(self, doc_fingerprint):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT fingerprint, filename, chunk_count, indexed_at FROM documents WHERE fingerprint = ?;",
+                (doc_fingerprint,)
+            ).fetchone()
+            return self._document(row)
+
+    def known_chunk_ids(self, chunk_ids):
+        """Return the subset of chunk_ids already indexed by any registered document"""
+        chunk_ids = list(chunk_ids)
+        known = set()
+        with self.lock:
+            for i in range(0, len(chunk_ids), QUERY_BATCH_SIZE):
+                batch = chunk_ids[i:i + QUERY_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                known.update(r[0] for r in self.conn.execute(
+                    f"SELECT DISTINCT chunk_id FROM document_chunks WHERE chunk_id IN ({placeholders});", batch
+                ))
+        return known
+
+    def register(self, doc_fingerprint, filename, chunk_ids):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO documents (fingerprint, filename, chunk_count, indexed_at) VALUES (?, ?, ?, ?);",
+                (doc_fingerprint, filename, len(chunk_ids), time.time())
+            )
+            self.conn.execute("DELETE FROM document_chunks WHERE fingerprint = ?;", (doc_fingerprint,))
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO document_chunks (fingerprint, chunk_id) VALUES (?, ?);",
+                [(doc_fingerprint, cid) for cid in chunk_ids]
+            )
+            self.conn.commit()
+
+    def remove(self, doc_fingerprint):
+        """Unregister a document and return the chunk IDs no other document still uses"""
+        document = self.get(doc_fingerprint)
+        if document is None:
+            return []
+        with self.lock:
+            self.conn.execute("DELETE FROM documents WHERE fingerprint = ?;", (doc_fingerprint,))
+            self.conn.execute("DELETE FROM document_chunks WHERE fingerprint = ?;", (doc_fingerprint,))
+            self.conn.commit()
+        still_used = self.known_chunk_ids(document["chunk_ids"])
+        return [cid for cid in document["chunk_ids"] if cid not in still_used]
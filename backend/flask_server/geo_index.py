@@ -0,0 +1,121 @@
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+# Same sphere as haversine_km, so the search box and the distances agree
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# Pads the box against rounding for points that sit exactly on its edge
+BOX_PAD_DEG = 1e-9
+
+
+def haversine_km(lat, lng, latitudes, longitudes):
+    lat, lng = math.radians(lat), math.radians(lng)
+    latitudes, longitudes = np.radians(latitudes), np.radians(longitudes)
+    a = (np.sin((latitudes - lat) / 2) ** 2
+         + math.cos(lat) * np.cos(latitudes) * np.sin((longitudes - lng) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeoGridIndex:
+    """Fixed-size lat/lng grid over a set of points, queried with haversine distance.
+
+    Points are sorted by cell so each cell is a contiguous slice. A query only
+    computes distances for points in the cells around the query location,
+    widening the search radius until k points are found.
+    """
+
+    def __init__(self, latitudes, longitudes, ids=None, cell_deg=0.1):
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        ids = np.arange(len(latitudes)) if ids is None else np.asarray(ids)
+
+        # Points without coordinates can't be placed on the grid
+        valid = np.isfinite(latitudes) & np.isfinite(longitudes)
+        latitudes, longitudes, ids = latitudes[valid], longitudes[valid], ids[valid]
+
+        self.cell_deg = cell_deg
+        rows = np.floor(latitudes / cell_deg).astype(np.int64)
+        cols = np.floor(longitudes / cell_deg).astype(np.int64)
+        order = np.lexsort((cols, rows))
+        self.latitudes = latitudes[order]
+        self.longitudes = longitudes[order]
+        self.ids = ids[order]
+        rows, cols = rows[order], cols[order]
+
+        self.cells = {}
+        if len(order):
+            boundaries = np.flatnonzero((np.diff(rows) != 0) | (np.diff(cols) != 0)) + 1
+            starts = np.concatenate(([0], boundaries))
+            ends = np.concatenate((boundaries, [len(order)]))
+            for start, end in zip(starts, ends):
+                self.cells[(int(rows[start]), int(cols[start]))] = (int(start), int(end))
+
+        if self.cells:
+            keys = np.array(list(self.cells))
+            self.row_range = (int(keys[:, 0].min()), int(keys[:, 0].max()))
+            self.col_range = (int(keys[:, 1].min()), int(keys[:, 1].max()))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _candidates(self, lat, lng, radius_km):
+        # Smallest lat/lng box holding the spherical cap of radius_km around the point
+        angle = radius_km / EARTH_RADIUS_KM
+        dlat = math.degrees(angle) + BOX_PAD_DEG
+        cos_lat = math.cos(math.radians(lat))
+        if angle >= math.pi / 2 or math.sin(angle) >= cos_lat:
+            # The cap reaches a pole, so it spans every longitude
+            dlng = 360.0
+        else:
+            dlng = math.degrees(math.asin(math.sin(angle) / cos_lat)) + BOX_PAD_DEG
+
+        row_lo = max(math.floor((lat - dlat) / self.cell_deg), self.row_range[0])
+        row_hi = min(math.floor((lat + dlat) / self.cell_deg), self.row_range[1])
+        if dlng >= 180.0 or lng - dlng < -180.0 or lng + dlng > 180.0:
+            # Box wraps the antimeridian; just search every column
+            col_lo, col_hi = self.col_range
+        else:
+            col_lo = max(math.floor((lng - dlng) / self.cell_deg), self.col_range[0])
+            col_hi = min(math.floor((lng + dlng) / self.cell_deg), self.col_range[1])
+
+        covers_all = (row_lo, row_hi) == self.row_range and (col_lo, col_hi) == self.col_range
+        if (row_hi - row_lo + 1) * (col_hi - col_lo + 1) > len(self.cells):
+            # Scanning the box would visit more cells than exist
+            slices = [
+                span for (row, col), span in self.cells.items()
+                if row_lo <= row <= row_hi and col_lo <= col <= col_hi
+            ]
+        else:
+            slices = [
+                self.cells[(row, col)]
+                for row in range(row_lo, row_hi + 1)
+                for col in range(col_lo, col_hi + 1)
+                if (row, col) in self.cells
+            ]
+        if not slices:
+            return np.empty(0, dtype=np.int64), covers_all
+        return np.concatenate([np.arange(start, end) for start, end in slices]), covers_all
+
+    def query(self, lat, lng, k=10, radius_km=None):
+        """Return up to k (id, distance_km) pairs, nearest first, within radius_km if given"""
+        if not self.cells or k <= 0:
+            return []
+
+        search_km = radius_km if radius_km is not None else self.cell_deg * KM_PER_DEGREE
+        while True:
+            positions, covers_all = self._candidates(lat, lng, search_km)
+            distances = haversine_km(lat, lng, self.latitudes[positions], self.longitudes[positions])
+            within = distances <= search_km
+            # Every point within search_km lies inside the box, so these results are exact
+            if radius_km is not None or within.sum() >= k or covers_all:
+                if radius_km is not None or not covers_all:
+                    positions, distances = positions[within], distances[within]
+                break
+            search_km *= 2
+
+        if len(distances) > k:
+            top = np.argpartition(distances, k - 1)[:k]
+            positions, distances = positions[top], distances[top]
+        order = np.argsort(distances)
+        return [(self.ids[p].item(), float(d)) for p, d in zip(positions[order], distances[order])]
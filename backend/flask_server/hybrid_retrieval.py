@@ -0,0 +1,32 @@
+from langchain_core.documents import Document
+
+# Standard damping constant for reciprocal rank fusion
+RRF_K = 60
+
+
+def document_text(doc):
+    return doc.metadata.get("chunk_text") or doc.page_content
+
+
+def fuse_results(vector_docs, lexical_results, k, rrf_k=RRF_K):
+    """Merge vector and BM25 results with reciprocal rank fusion.
+
+    Chunks are matched by their text, so the same chunk found by both
+    retrievers is counted once with both ranks added together.
+    """
+    scores = {}
+    docs = {}
+
+    for rank, doc in enumerate(vector_docs):
+        key = document_text(doc)
+        scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+        docs.setdefault(key, doc)
+
+    for rank, (doc_id, _, metadata) in enumerate(lexical_results):
+        doc = Document(id=doc_id, page_content=metadata.get("chunk_text", ""), metadata=metadata)
+        key = document_text(doc)
+        scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+        docs.setdefault(key, doc)
+
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [docs[key] for key in ranked[:k]]
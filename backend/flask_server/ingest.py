@@ -0,0 +1,58 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# data_preprocessing is on sys.path (see app.py), so both sides share one batch size
+from embedding_scheduler import EMBED_BATCH_SIZE
+
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", 100))
+MAX_PENDING_UPSERTS = 2
+
+
+def batched(items, batch_size):
+    """Helper to split a list into fixed-size batches"""
+    for i in range(0, len(items), batch_size):
+        yield i, items[i:i + batch_size]
+
+
+def embed_and_upsert(chunks, embeddings, index, namespace, build_vector,
+                     embed_batch_size=EMBED_BATCH_SIZE, upsert_batch_size=UPSERT_BATCH_SIZE):
+    """Embed chunks in batches and upsert them while the next batch is embedding.
+
+    build_vector(i, chunk, values) returns the Pinecone record for chunk i.
+    Returns the time spent in each stage (seconds).
+    """
+    timings = {"embed": 0.0, "upsert": 0.0}
+
+    def upsert(batch):
+        start = time.perf_counter()
+        index.upsert(vectors=batch, namespace=namespace)
+        return time.perf_counter() - start
+
+    pending = []
+    in_flight = []
+    # A single upsert worker keeps batches ordered and overlaps network I/O with embedding
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        def submit(batch):
+            # Bound how many upserts can queue up behind a slow index
+            while len(in_flight) >= MAX_PENDING_UPSERTS:
+                timings["upsert"] += in_flight.pop(0).result()
+            in_flight.append(executor.submit(upsert, batch))
+
+        for offset, batch in batched(chunks, embed_batch_size):
+            start = time.perf_counter()
+            values = embeddings.embed_documents(batch)
+            timings["embed"] += time.perf_counter() - start
+
+            for i, (chunk, vector) in enumerate(zip(batch, values)):
+                pending.append(build_vector(offset + i, chunk, vector))
+            while len(pending) >= upsert_batch_size:
+                submit(pending[:upsert_batch_size])
+                pending = pending[upsert_batch_size:]
+
+        if pending:
+            submit(pending)
+        for future in in_flight:
+            timings["upsert"] += future.result()
+
+    return timings
@@ -0,0 +1,112 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from flask import Response
+
+from geo_index import GeoGridIndex
+
+PAGE_CACHE_SIZE = 256
+GZIP_MIN_BYTES = 1024
+
+
+def dumps(value):
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+class LawyerStore:
+    """Serves the lawyer records from JSON serialized once per dataset load.
+
+    Each record is serialized up front, so a page is built by joining the
+    pre-serialized records it contains. Built pages (body, gzip body and ETag)
+    are kept in a small LRU keyed on the query.
+    """
+
+    def __init__(self, df, version=None):
+        # NaN is not valid JSON; send null instead
+        df = df.astype(object).where(df.notna(), None)
+        self.version = version
+        self.columns = list(df.columns)
+        self.records = df.to_dict(orient="records")
+        self.serialized = [dumps(record) for record in self.records]
+
+        self.by_category = {}
+        for i, record in enumerate(self.records):
+            self.by_category.setdefault(record.get("category"), []).append(i)
+
+        self.pages = OrderedDict()
+        self.geo_indexes = {}
+        self.lock = threading.Lock()
+
+    def page(self, category=None, offset=0, limit=None, fields=None):
+        key = (category, offset, limit, tuple(fields) if fields else None)
+        with self.lock:
+            if key in self.pages:
+                self.pages.move_to_end(key)
+                return self.pages[key]
+
+        if category is None:
+            indices = range(len(self.records))
+        else:
+            indices = self.by_category.get(category, [])
+        total = len(indices)
+        selected = indices[offset:offset + limit if limit is not None else None]
+
+        if fields:
+            parts = [dumps({field: self.records[i].get(field) for field in fields}) for i in selected]
+        else:
+            parts = [self.serialized[i] for i in selected]
+        body = ("[" + ",".join(parts) + "]").encode("utf-8")
+
+        page = {
+            "body": body,
+            "gzip": gzip.compress(body) if len(body) >= GZIP_MIN_BYTES else None,
+            "etag": hashlib.sha256(body).hexdigest(),
+            "total": total
+        }
+        with self.lock:
+            self.pages[key] = page
+            while len(self.pages) > PAGE_CACHE_SIZE:
+                self.pages.popitem(last=False)
+        return page
+
+    def geo_index(self, category=None):
+        # Built on first use per category and kept for the lifetime of this dataset load
+        with self.lock:
+            if category not in self.geo_indexes:
+                ids = list(range(len(self.records))) if category is None else self.by_category.get(category, [])
+                latitudes = [self._coordinate(self.records[i].get("latitude")) for i in ids]
+                longitudes = [self._coordinate(self.records[i].get("longitude")) for i in ids]
+                self.geo_indexes[category] = GeoGridIndex(latitudes, longitudes, ids=ids)
+            return self.geo_indexes[category]
+
+    def _coordinate(self, value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return float("nan")
+
+    def nearby(self, lat, lng, k=10, radius_km=None, category=None):
+        matches = self.geo_index(category).query(lat, lng, k=k, radius_km=radius_km)
+        return [dict(self.records[i], distance_km=round(distance, 3)) for i, distance in matches]
+
+    def response(self, page, request):
+        headers = {
+            "X-Total-Count": str(page["total"]),
+            "Vary": "Accept-Encoding",
+            "Access-Control-Expose-Headers": "ETag, X-Total-Count"
+        }
+        use_gzip = page["gzip"] is not None and "gzip" in request.accept_encodings
+        # A strong ETag has to differ between content codings of the same page
+        etag = page["etag"] + "-gzip" if use_gzip else page["etag"]
+        if request.if_none_match.contains(etag):
+            response = Response(status=304, headers=headers)
+        elif use_gzip:
+            response = Response(page["gzip"], mimetype="application/json", headers=headers)
+            response.headers["Content-Encoding"] = "gzip"
+        else:
+            response = Response(page["body"], mimetype="application/json", headers=headers)
+        response.set_etag(etag)
+        return response
@@ -0,0 +1,173 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# Dependency-free Prometheus metrics: counters, gauges and histograms with labels,
+# rendered in the text exposition format for GET /metrics.
+
+# Seconds; spans a cache hit (~1 ms) to a slow LLM call (~1 min)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+logger = logging.getLogger("legal_compass.timing")
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in key) + "}"
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, key, value) for key, value in self.values.items()]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for key, series in self.values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", key + (("le", repr(float(bound))),), cumulative))
+                samples.append((f"{self.name}_bucket", key + (("le", "+Inf"),), series["count"]))
+                samples.append((f"{self.name}_sum", key, series["sum"]))
+                samples.append((f"{self.name}_count", key, series["count"]))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help):
+        return self._add(Counter(name, help))
+
+    def gauge(self, name, help):
+        return self._add(Gauge(name, help))
+
+    def histogram(self, name, help, buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, key, value in metric.samples():
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_SECONDS = registry.histogram("legal_compass_request_seconds", "Request latency by route")
+REQUESTS_IN_FLIGHT = registry.gauge("legal_compass_requests_in_flight", "Requests currently being served by route")
+REQUEST_ERRORS = registry.counter("legal_compass_request_errors_total", "Requests that failed with a 5xx or an exception")
+STAGE_SECONDS = registry.histogram("legal_compass_stage_seconds", "Latency of each stage of a request")
+RETRIEVALS = registry.counter("legal_compass_retrievals_total", "Legal retrievals by result (hit or empty)")
+RETRIEVAL_CACHE = registry.counter("legal_compass_retrieval_cache_total", "Retrieval cache lookups by result")
+ANSWER_CACHE = registry.counter("legal_compass_answer_cache_total", "Semantic answer cache lookups by result")
+SINGLE_FLIGHT = registry.counter(
+    "legal_compass_single_flight_total",
+    "Identical concurrent requests by role: leader (computed), merged (waited) or grace (reused a fresh result)"
+)
+
+
+class StageTimer:
+    """Times the stages of one request into STAGE_SECONDS and logs them as one JSON line"""
+
+    def __init__(self, route):
+        self.route = route
+        self.start = time.perf_counter()
+        self.timings = {}
+
+    def record(self, stage, seconds):
+        self.timings[stage] = seconds
+        STAGE_SECONDS.observe(seconds, route=self.route, stage=stage)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def log(self, **fields):
+        timings = {stage: round(seconds, 4) for stage, seconds in self.timings.items()}
+        timings["total"] = round(time.perf_counter() - self.start, 4)
+        logger.info(json.dumps({"route": self.route, **fields, "timings": timings}))
+
+
+@contextmanager
+def track_request(route):
+    """In-flight gauge, latency histogram and error counter for a request handled outside Flask"""
+    REQUESTS_IN_FLIGHT.inc(route=route)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        REQUEST_ERRORS.inc(route=route)
+        raise
+    finally:
+        REQUESTS_IN_FLIGHT.dec(route=route)
+        REQUEST_SECONDS.observe(time.perf_counter() - start, route=route)
@@ -0,0 +1,69 @@
+import os
+import threading
+from collections import OrderedDict
+
+from tokens import normalize_question
+
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", 5000))
+
+
+class RetrievalCache:
+    """Caches retrieved chunks per (namespace, normalized query, k).
+
+    Each entry remembers the namespace generation it was retrieved at; once
+    an ingest bumps that generation the entry is treated as a miss and
+    dropped. The least recently used entries go first when the cache is full.
+    """
+
+    def __init__(self, generations, max_entries=RETRIEVAL_CACHE_MAX_ENTRIES):
+        self.generations = generations
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def key(self, namespace, query, k):
+        return namespace, normalize_question(query), k
+
+    def get(self, namespace, query, k):
+        key = self.key(namespace, query, k)
+        generation = self.generations.get(namespace)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] != generation:
+                del self.entries[key]
+                self.invalidations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+
+    def put(self, namespace, query, k, docs, generation):
+        """generation must be read before retrieving, so a write during retrieval isn't missed"""
+        key = self.key(namespace, query, k)
+        with self.lock:
+            self.entries[key] = (generation, list(docs))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
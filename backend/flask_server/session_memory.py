@@ -0,0 +1,133 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from tokens import count_tokens, truncate_to_tokens
+
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", 600))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", 30 * 60))
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", 5000))
+MAX_SESSION_TOKENS = int(os.getenv("MAX_SESSION_TOKENS", 2_000_000))
+
+logger = logging.getLogger("legal_compass.timing")
+
+
+class SessionMemoryStore:
+    """Per-session conversation history with a fixed token budget.
+
+    Once a session goes over its budget the oldest turns are dropped, or folded
+    into a rolling summary when a summarize(summary, turns) callable is given.
+    Idle sessions expire, and the least recently used sessions are evicted when
+    the store holds too many sessions or tokens overall.
+    """
+
+    def __init__(self, token_budget=SESSION_TOKEN_BUDGET, idle_ttl=SESSION_IDLE_TTL,
+                 max_sessions=MAX_SESSIONS, max_total_tokens=MAX_SESSION_TOKENS, summarize=None):
+        self.token_budget = token_budget
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.max_total_tokens = max_total_tokens
+        self.summarize = summarize
+        self.sessions = OrderedDict()
+        self.total_tokens = 0
+        self.lock = threading.Lock()
+        self.evictions = 0
+
+    def _session_tokens(self, session):
+        return session["summary_tokens"] + sum(turn["tokens"] for turn in session["turns"])
+
+    def _drop(self, session_id):
+        session = self.sessions.pop(session_id)
+        self.total_tokens -= session["tokens"]
+        self.evictions += 1
+
+    def _evict(self, now):
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            idle = now - session["last_used"] > self.idle_ttl
+            over_cap = len(self.sessions) > self.max_sessions or self.total_tokens > self.max_total_tokens
+            if not (idle or over_cap):
+                break
+            self._drop(session_id)
+
+    def _update_tokens(self, session):
+        tokens = self._session_tokens(session)
+        self.total_tokens += tokens - session["tokens"]
+        session["tokens"] = tokens
+
+    def history(self, session_id):
+        """Return the session's summary and recent turns formatted for the prompt"""
+        with self.lock:
+            self._evict(time.time())
+            session = self.sessions.get(session_id)
+            if session is None:
+                return ""
+            summary = session["summary"]
+            turns = list(session["turns"])
+
+        lines = []
+        if summary:
+            lines.append(f"Summary of earlier conversation: {summary}")
+        for turn in turns:
+            lines.append(f"User: {turn['question']}")
+            lines.append(f"Assistant: {turn['answer']}")
+        return "\n".join(lines)
+
+    def add_turn(self, session_id, question, answer):
+        turn = {"question": question, "answer": answer, "tokens": count_tokens(question) + count_tokens(answer)}
+        now = time.time()
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = {"summary": "", "summary_tokens": 0, "turns": deque(), "tokens": 0, "last_used": now}
+                self.sessions[session_id] = session
+            self.sessions.move_to_end(session_id)
+            session["last_used"] = now
+            session["turns"].append(turn)
+
+            # Keep at least the latest turn; everything older goes once over budget
+            dropped = []
+            while len(session["turns"]) > 1 and self._session_tokens(session) > self.token_budget:
+                dropped.append(session["turns"].popleft())
+            if self._session_tokens(session) > self.token_budget:
+                # The latest turn alone is over budget: trim it, answer first, so the prompt stays bounded
+                room = max(self.token_budget - session["summary_tokens"], 0)
+                question = truncate_to_tokens(turn["question"], room)
+                answer = truncate_to_tokens(turn["answer"], max(room - count_tokens(question), 0))
+                turn.update(question=question, answer=answer, tokens=count_tokens(question) + count_tokens(answer))
+            summary = session["summary"]
+            self._update_tokens(session)
+            self._evict(now)
+
+        if dropped and self.summarize:
+            # Summarize outside the lock; it is usually an LLM call
+            try:
+                summary = self.summarize(summary, dropped)
+            except Exception as e:
+                logger.warning("Could not summarize session %s: %s", session_id, e)
+                return
+            with self.lock:
+                session = self.sessions.get(session_id)
+                if session is None:
+                    return
+                recent = sum(turn["tokens"] for turn in session["turns"])
+                # The summary only gets whatever budget the recent turns leave over
+                session["summary"] = truncate_to_tokens(summary, max(self.token_budget - recent, 0))
+                session["summary_tokens"] = count_tokens(session["summary"])
+                self._update_tokens(session)
+
+    def clear(self, session_id):
+        with self.lock:
+            if session_id in self.sessions:
+                self._drop(session_id)
+
+    def stats(self):
+        with self.lock:
+            self._evict(time.time())
+            return {
+                "sessions": len(self.sessions),
+                "tokens": self.total_tokens,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import threading
+import time
+
+from metrics import SINGLE_FLIGHT
+
+# Seconds a finished result keeps being handed to identical requests that arrive late
+SINGLE_FLIGHT_GRACE = float(os.getenv("SINGLE_FLIGHT_GRACE", 2))
+
+
+class SingleFlight:
+    """Runs one computation per key at a time; concurrent callers with the same key
+    wait for it and share its result instead of starting their own.
+
+    A finished result stays available for `grace` seconds. Errors are passed to
+    everyone already waiting but are never kept for later callers.
+    """
+
+    def __init__(self, grace=SINGLE_FLIGHT_GRACE, name="ask"):
+        self.grace = grace
+        self.name = name
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def _expire(self, now):
+        expired = [key for key, call in self.calls.items()
+                   if call["done_at"] is not None and now - call["done_at"] > self.grace]
+        for key in expired:
+            del self.calls[key]
+
+    def _join(self, key, new_call):
+        """Return (call, is_leader) for key, registering new_call if nothing is in flight"""
+        with self.lock:
+            self._expire(time.monotonic())
+            call = self.calls.get(key)
+            if call is None:
+                self.calls[key] = call = new_call
+                SINGLE_FLIGHT.inc(flight=self.name, result="leader")
+                return call, True
+        SINGLE_FLIGHT.inc(flight=self.name, result="merged" if call["done_at"] is None else "grace")
+        return call, False
+
+    def _finish(self, key, call, failed):
+        with self.lock:
+            call["done_at"] = time.monotonic()
+            if failed and self.calls.get(key) is call:
+                del self.calls[key]
+
+    def do(self, key, fn):
+        """Return (result, shared), where shared is True if another caller computed it"""
+        call, leader = self._join(key, {"event": threading.Event(), "result": None, "error": None, "done_at": None})
+        if not leader:
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"], True
+
+        try:
+            call["result"] = fn()
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            self._finish(key, call, call["error"] is not None)
+            call["event"].set()
+        return call["result"], False
+
+
+class AsyncSingleFlight(SingleFlight):
+    """SingleFlight for coroutines on one event loop (ASGI mode)"""
+
+    async def do(self, key, coro_fn):
+        call, leader = self._join(key, {"future": asyncio.get_running_loop().create_future(), "done_at": None})
+        if not leader:
+            # Shielded so a follower that disconnects doesn't cancel the shared computation
+            return await asyncio.shield(call["future"]), True
+
+        try:
+            result = await coro_fn()
+        except BaseException as e:
+            self._finish(key, call, True)
+            if isinstance(e, Exception):
+                call["future"].set_exception(e)
+                # Mark it retrieved so an error nobody else waited on isn't logged
+                call["future"].exception()
+            else:
+                call["future"].cancel()
+            raise
+        self._finish(key, call, False)
+        call["future"].set_result(result)
+        return result, False
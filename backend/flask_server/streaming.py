@@ -0,0 +1,124 @@
+import json
+import re
+import time
+
+
+def sse_event(data, event=None):
+    """Format a payload as a single Server-Sent Events message"""
+    message = ""
+    if event:
+        message += f"event: {event}\n"
+    message += f"data: {json.dumps(data)}\n\n"
+    return message
+
+
+def clean_response(response):
+    return re.sub(r'^-+\n*|\n*-+$', '', response).strip()
+
+
+class ResponseCleaner:
+    """Incremental version of clean_response for streamed tokens.
+
+    A leading run of dashes (and the newlines after it) is only dropped at the
+    very start of the response, leading whitespace is dropped before anything
+    is emitted, and a trailing run of dashes/whitespace is held back until
+    either more text arrives or the stream finishes.
+    """
+
+    def __init__(self):
+        self.head_done = False
+        self.started = False
+        self.head = ""
+        self.tail = ""
+
+    def feed(self, token):
+        if not self.head_done:
+            self.head += token
+            # Same as the ^-+\n* part of clean_response, at offset 0 only
+            match = re.match(r"-+\n*", self.head)
+            if match and match.end() == len(self.head):
+                # The run may continue in the next token
+                return ""
+            token = self.head[match.end():] if match else self.head
+            self.head_done = bool(self.head)
+            self.head = ""
+
+        if not self.started:
+            # Same as the leading half of strip()
+            token = token.lstrip()
+            if not token:
+                return ""
+            self.started = True
+
+        text = self.tail + token
+        body = re.sub(r"[-\s]*$", "", text)
+        self.tail = text[len(body):]
+        return body
+
+    def finish(self):
+        if not self.started:
+            return ""
+        # Same as the \n*-+$ part of clean_response, followed by strip()
+        tail = re.sub(r"\n*-+$", "", self.tail).rstrip()
+        self.tail = ""
+        return tail
+
+
+class AnswerStream:
+    """Builds the SSE events for a streamed answer from raw LLM tokens.
+
+    Shared by the Flask and async /ask/stream routes; each method returns the
+    list of events to send.
+    """
+
+    def __init__(self, start, retrieval_time):
+        self.start = start
+        self.retrieval_time = retrieval_time
+        self.cleaner = ResponseCleaner()
+        self.first_token_time = None
+        self.parts = []
+
+    @property
+    def response(self):
+        return "".join(self.parts)
+
+    def opening(self):
+        return [sse_event({"retrieval_time": round(self.retrieval_time, 4)}, event="meta")]
+
+    def _text(self, text):
+        if not text:
+            return []
+        self.parts.append(text)
+        return [sse_event({"token": text})]
+
+    def token(self, token):
+        events = []
+        if self.first_token_time is None:
+            self.first_token_time = time.perf_counter() - self.start
+            events.append(sse_event({"time_to_first_token": round(self.first_token_time, 4)}, event="meta"))
+        return events + self._text(self.cleaner.feed(token))
+
+    def finish(self):
+        events = self._text(self.cleaner.finish())
+        events.append(sse_event({
+            "response": self.response,
+            "cached": False,
+            "retrieval_time": round(self.retrieval_time, 4),
+            "time_to_first_token": round(self.first_token_time, 4) if self.first_token_time is not None else None,
+            "total_time": round(time.perf_counter() - self.start, 4)
+        }, event="done"))
+        return events
+
+
+def cached_answer_events(response, start, retrieval_time):
+    return [
+        sse_event({"retrieval_time": round(retrieval_time, 4), "cached": True}, event="meta"),
+        sse_event({"token": response}),
+        sse_event({
+            "response": response,
+            "cached": True,
+            "retrieval_time": round(retrieval_time, 4),
+            "time_to_first_token": round(retrieval_time, 4),
+            "total_time": round(time.perf_counter() - start, 4)
+        }, event="done")
+    ]
@@ -0,0 +1,54 @@
+import math
+import random
+
+import numpy as np
+import pandas as pd
+
+from geo_index import EARTH_RADIUS_KM, haversine_km
+from lawyer_store import LawyerStore
+
+
+def destination(lat, lng, bearing, distance_km):
+    """Point distance_km away from (lat, lng) along bearing (degrees), on the haversine sphere"""
+    lat, lng, bearing = map(math.radians, (lat, lng, bearing))
+    angle = distance_km / EARTH_RADIUS_KM
+    lat2 = math.asin(math.sin(lat) * math.cos(angle) + math.cos(lat) * math.sin(angle) * math.cos(bearing))
+    lng2 = lng + math.atan2(math.sin(bearing) * math.sin(angle) * math.cos(lat),
+                            math.cos(angle) - math.sin(lat) * math.sin(lat2))
+    return math.degrees(lat2), (math.degrees(lng2) + 540) % 360 - 180
+
+
+def brute_force(store, lat, lng, k, radius_km=None):
+    latitudes = np.array([record["latitude"] for record in store.records], dtype=np.float64)
+    longitudes = np.array([record["longitude"] for record in store.records], dtype=np.float64)
+    distances = haversine_km(lat, lng, latitudes, longitudes)
+    candidates = [(d, i) for i, d in enumerate(distances) if radius_km is None or d <= radius_km]
+    return sorted(candidates)[:k]
+
+
+def assert_matches(store, lat, lng, k, radius_km=None):
+    expected = brute_force(store, lat, lng, k, radius_km)
+    results = store.nearby(lat, lng, k=k, radius_km=radius_km)
+    assert [r["distance_km"] for r in results] == [round(d, 3) for d, _ in expected], (lat, lng, k, radius_km)
+
+
+def test_point_just_inside_radius():
+    lat, lng = destination(34.0015, -118.05, 0, 99.95)
+    store = LawyerStore(pd.DataFrame({"name": ["north"], "latitude": [lat], "longitude": [lng]}))
+    results = store.nearby(34.0015, -118.05, k=10, radius_km=100)
+    assert [r["name"] for r in results] == ["north"]
+
+
+def test_matches_brute_force_at_radius_edge():
+    rng = random.Random(0)
+    for _ in range(200):
+        lat, lng = rng.uniform(-85, 85), rng.uniform(-179, 179)
+        radius_km = rng.choice([1, 10, 100, 1000])
+        points = [destination(lat, lng, rng.uniform(0, 360), radius_km * rng.choice([0.999, 1.0, 1.001]))
+                  for _ in range(20)]
+        points += [destination(lat, lng, rng.uniform(0, 360), rng.uniform(0, 2 * radius_km))
+                   for _ in range(20)]
+        latitudes, longitudes = zip(*points)
+        store = LawyerStore(pd.DataFrame({"latitude": latitudes, "longitude": longitudes}))
+        assert_matches(store, lat, lng, k=100, radius_km=radius_km)
+        assert_matches(store, lat, lng, k=5)
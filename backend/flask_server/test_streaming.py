@@ -0,0 +1,22 @@
+import random
+
+from streaming import ResponseCleaner, clean_response
+
+
+def stream_clean(tokens):
+    cleaner = ResponseCleaner()
+    return "".join(cleaner.feed(token) for token in tokens) + cleaner.finish()
+
+
+def test_keeps_list_dash_after_leading_newline():
+    tokens = ["\n", "- bullet", " one\n", "---"]
+    assert stream_clean(tokens) == clean_response("".join(tokens)) == "- bullet one"
+
+
+def test_matches_clean_response():
+    rng = random.Random(0)
+    pieces = ["-", "--", "\n", "\n-", " ", "\t", "a", "b"]
+    for _ in range(20000):
+        tokens = ["".join(rng.choice(pieces) for _ in range(rng.randint(0, 4)))
+                  for _ in range(rng.randint(0, 6))]
+        assert stream_clean(tokens) == clean_response("".join(tokens)), tokens
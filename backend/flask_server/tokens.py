@@ -0,0 +1,31 @@
+import re
+
+# Rough number of characters per token for English text with Mistral/Llama style tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text):
+    """Cheap token estimate used for prompt and memory budgets"""
+    if not text:
+        return 0
+    words = len(re.findall(r"\S+", text))
+    return max(words, len(text) // CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut text at a word boundary so that count_tokens(result) <= max_tokens"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    # count_tokens takes the larger of the word and character estimates, so respect both
+    text = text[:max_tokens * CHARS_PER_TOKEN]
+    words = list(re.finditer(r"\S+", text))
+    if len(words) > max_tokens:
+        return text[:words[max_tokens - 1].end()]
+    return text.rsplit(" ", 1)[0]
+
+
+def normalize_question(question):
+    """Lowercase and collapse whitespace, for keying caches on the question text"""
+    return " ".join(question.lower().split())
@@ -0,0 +1,54 @@
+import os
+
+import pandas as pd
+
+# Rows per multi-row INSERT into the staging table, and per chunk of the CSV export
+BULK_INSERT_SIZE = int(os.getenv("BULK_INSERT_SIZE", 5000))
+CSV_CHUNK_SIZE = int(os.getenv("CSV_CHUNK_SIZE", 5000))
+
+
+def bulk_update_by_id(cursor, table, columns, rows, batch_size=BULK_INSERT_SIZE):
+    """Set `columns` on many rows of `table` with one join UPDATE keyed by id.
+
+    columns maps column name -> SQL type, e.g. {"latitude": "FLOAT"}; rows are
+    (id, value, ...) tuples in the same order. The values are staged in a
+    temporary table first, so the update costs one statement rather than one
+    lookup per row. Returns the number of rows changed; the caller commits.
+    """
+    staging = f"{table}_updates"
+    names = list(columns)
+    cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging};")
+    cursor.execute(
+        f"CREATE TEMPORARY TABLE {staging} (id INT PRIMARY KEY, "
+        + ", ".join(f"{name} {sql_type}" for name, sql_type in columns.items()) + ");"
+    )
+    insert = f"INSERT INTO {staging} (id, {', '.join(names)}) VALUES ({', '.join(['%s'] * (len(names) + 1))})"
+    rows = list(rows)
+    # mysql-connector rewrites executemany INSERTs into multi-row INSERTs
+    for start in range(0, len(rows), batch_size):
+        cursor.executemany(insert, rows[start:start + batch_size])
+
+    cursor.execute(
+        f"UPDATE {table} t JOIN {staging} u ON t.id = u.id SET "
+        + ", ".join(f"t.{name} = u.{name}" for name in names) + ";"
+    )
+    updated = cursor.rowcount
+    cursor.execute(f"DROP TEMPORARY TABLE {staging};")
+    return updated
+
+
+def export_csv(cursor, query, path, chunk_size=CSV_CHUNK_SIZE):
+    """Stream query's result set to a CSV in chunks instead of loading it whole"""
+    cursor.execute(query)
+    columns = cursor.column_names
+    total = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            pd.DataFrame.from_records(rows, columns=columns).to_csv(f, header=total == 0, index=False)
+            total += len(rows)
+        if total == 0:
+            pd.DataFrame(columns=columns).to_csv(f, index=False)
+    return total
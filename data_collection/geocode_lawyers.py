@@ -2,9 +2,10 @@ import mysql.connector
 import pandas as pd
 from pathlib import Path
 from sqlalchemy import create_engine
-import requests
-import time
-import urllib.parse
+import os
+
+from bulk_update import bulk_update_by_id, export_csv
+from geocoding import GeocodeCache, Geocoder, get_provider, normalize_address
 
 # Paths
 BASE_DIR = Path(r"C:\Users\farih\OneDrive\Desktop\560\finalproj")
@@ -20,8 +21,8 @@ db_config = {
 }
 engine = create_engine(f"mysql+mysqlconnector://{db_config['user']}:{db_config['password']}@{db_config['host']}/{db_config['database']}")
 
-# Geocod.io setup
-GEOCODIO_API_KEY = "e7ee16733763fcf5ef66d6767ff3fd315dd7513"  # Replace with new key from https://dash.geocod.io/
+# Geocod.io setup (GEOCODE_PROVIDER=csv answers from an existing geocoded CSV instead)
+GEOCODIO_API_KEY = os.getenv("GEOCODIO_API_KEY", "e7ee16733763fcf5ef66d6767ff3fd315dd7513")  # Replace with new key from https://dash.geocod.io/
 
 # Step 1: Ensure columns exist
 def ensure_columns():
@@ -34,64 +35,40 @@ def ensure_columns():
     cursor.close()
     conn.close()
 
-# Step 2: Clean address
-def clean_address(address):
-    if not address:
-        return None
-    address = address.replace("Aveune", "Avenue").replace("#", "").strip()
-    return address
-
-# Step 3: Geocode addresses
+# Step 2: Geocode addresses
 def geocode_addresses():
-    query = "SELECT name, address FROM lawyers;"
+    query = "SELECT id, name, address FROM lawyers;"
     df = pd.read_sql(query, engine)
     
-    df["latitude"] = None
-    df["longitude"] = None
-    
-    for idx, row in df.iterrows():
-        address = clean_address(row["address"])
-        if not address:
-            print(f"Skipping empty address for {row['name']}")
-            continue
-        try:
-            encoded_address = urllib.parse.quote(address)
-            url = f"https://api.geocod.io/v1.7/geocode?q={encoded_address}&api_key={GEOCODIO_API_KEY}"
-            response = requests.get(url, timeout=5)
-            response.raise_for_status()
-            data = response.json()
-            if data.get("results"):
-                loc = data["results"][0]["location"]
-                df.at[idx, "latitude"] = loc["lat"]
-                df.at[idx, "longitude"] = loc["lng"]
-                print(f"Geocoded {address}: ({loc['lat']}, {loc['lng']})")
-            else:
-                print(f"No results for {address}")
-            time.sleep(0.1)  # Rate limit
-        except requests.RequestException as e:
-            print(f"Failed to geocode {address}: {e}")
+    geocoder = Geocoder(get_provider(GEOCODIO_API_KEY), GeocodeCache())
+    coords = geocoder.geocode(df["address"])
+    located = df["address"].map(normalize_address).map(coords)
+    df["latitude"] = located.map(lambda c: c[0] if isinstance(c, tuple) else None)
+    df["longitude"] = located.map(lambda c: c[1] if isinstance(c, tuple) else None)
     
+    stats = geocoder.last_stats
+    print(f"Geocoded {located.notna().sum()}/{len(df)} lawyers from {stats['unique']} unique addresses "
+          f"({stats['cache_hits']} cached, {stats['requests']} batch requests, {stats['failed']} failed) "
+          f"in {stats['seconds']}s")
     return df
 
-# Step 4: Update MySQL and CSV
+# Step 3: Update MySQL and CSV
 def update_dataset(df):
     conn = mysql.connector.connect(**db_config)
     cursor = conn.cursor()
     
-    # Update rows
-    for _, row in df.iterrows():
-        if pd.notnull(row["latitude"]) and pd.notnull(row["longitude"]):
-            cursor.execute(
-                "UPDATE lawyers SET latitude = %s, longitude = %s WHERE name = %s AND address = %s;",
-                (row["latitude"], row["longitude"], row["name"], row["address"])
-            )
-    
+    # Update all geocoded rows with one join UPDATE keyed by id
+    located = df.dropna(subset=["latitude", "longitude"])
+    # tolist() hands the connector plain Python numbers rather than NumPy scalars
+    rows = list(zip(located["id"].astype(int).tolist(),
+                    located["latitude"].astype(float).tolist(),
+                    located["longitude"].astype(float).tolist()))
+    updated = bulk_update_by_id(cursor, "lawyers", {"latitude": "FLOAT", "longitude": "FLOAT"}, rows)
     conn.commit()
+    print(f"Updated coordinates for {updated} lawyers")
     
-    # Save full table to CSV
-    query = "SELECT * FROM lawyers;"
-    df_full = pd.read_sql(query, engine)
-    df_full.to_csv(OUTPUT_CSV_PATH, index=False)
+    # Stream the full table to CSV
+    export_csv(cursor, "SELECT * FROM lawyers ORDER BY id;", OUTPUT_CSV_PATH)
     
     cursor.close()
     conn.close()
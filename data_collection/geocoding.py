@@ -0,0 +1,257 @@
+import csv
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+GEOCODE_CACHE_PATH = os.getenv(
+    "GEOCODE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "geocode_cache.sqlite")
+)
+# Geocodio accepts up to 10,000 addresses per batch; smaller batches spread better over workers
+GEOCODE_BATCH_SIZE = int(os.getenv("GEOCODE_BATCH_SIZE", 100))
+GEOCODE_CONCURRENCY = int(os.getenv("GEOCODE_CONCURRENCY", 4))
+# Requests per second across all workers, and how many may go out back to back
+GEOCODE_RATE = float(os.getenv("GEOCODE_RATE", 10))
+GEOCODE_BURST = int(os.getenv("GEOCODE_BURST", 5))
+GEOCODE_RETRIES = int(os.getenv("GEOCODE_RETRIES", 3))
+GEOCODE_TIMEOUT = float(os.getenv("GEOCODE_TIMEOUT", 60))
+
+GEOCODIO_BATCH_URL = "https://api.geocod.io/v1.7/geocode"
+
+# Suites and floors share the building's coordinates, so they are dropped from the key
+_UNIT = re.compile(r"(?:#|\b(?:suite|ste|unit|room|rm|floor|apt)\b\.?)\s*[\w-]+", re.IGNORECASE)
+_ABBREVIATIONS = {
+    "aveune": "ave",
+    "avenue": "ave",
+    "boulevard": "blvd",
+    "street": "st",
+    "road": "rd",
+    "drive": "dr",
+    "place": "pl",
+    "parkway": "pkwy",
+    "highway": "hwy",
+    "lane": "ln",
+    "court": "ct",
+}
+_WORD = re.compile(r"[a-z]+")
+
+
+def normalize_address(address):
+    """Canonical form of an address, used both as the cache key and as the query.
+
+    Lower-cases, drops suite/floor/unit designators and punctuation, and
+    abbreviates street types, so "6255 Sunset Boulevard, Suite 1520" and
+    "6255 Sunset Blvd. #1520" become the same key.
+    """
+    if not address or not isinstance(address, str):
+        return None
+    address = _UNIT.sub("", address.lower())
+    address = _WORD.sub(lambda m: _ABBREVIATIONS.get(m.group(0), m.group(0)), address)
+    parts = [" ".join(re.sub(r"[^\w\s-]", " ", part).split()) for part in address.split(",")]
+    address = ", ".join(part for part in parts if part)
+    return address or None
+
+
+class GeocodeCache:
+    """address -> (lat, lng) on disk, keyed by the normalized address.
+
+    Addresses the provider had no result for are stored with NULL
+    coordinates so they aren't sent again; delete those rows to retry them.
+    """
+
+    def __init__(self, path=GEOCODE_CACHE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocodes ("
+            "address TEXT PRIMARY KEY, latitude REAL, longitude REAL, provider TEXT, updated_at REAL);"
+        )
+        self.conn.commit()
+
+    def get_many(self, addresses):
+        """Return {address: (lat, lng) or None} for the addresses that are cached"""
+        found = {}
+        addresses = list(addresses)
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(addresses), 500):
+            chunk = addresses[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT address, latitude, longitude FROM geocodes WHERE address IN ({','.join('?' * len(chunk))});",
+                chunk
+            ).fetchall()
+            for address, lat, lng in rows:
+                found[address] = (lat, lng) if lat is not None else None
+        return found
+
+    def put_many(self, results, provider):
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO geocodes (address, latitude, longitude, provider, updated_at) VALUES (?, ?, ?, ?, ?);",
+            [(address, *(coords or (None, None)), provider, now) for address, coords in results.items()]
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class TokenBucket:
+    """Thread-safe rate limiter: `rate` tokens per second, holding at most `capacity`"""
+
+    def __init__(self, rate=GEOCODE_RATE, capacity=GEOCODE_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RetryableError(Exception):
+    """A provider failure worth retrying: timeouts, connection errors, 429s and 5xx"""
+
+
+class GeocodioProvider:
+    """Geocodio batch API. geocode_batch returns one (lat, lng) or None per address."""
+
+    name = "geocodio"
+
+    def __init__(self, api_key, batch_size=GEOCODE_BATCH_SIZE, timeout=GEOCODE_TIMEOUT):
+        self.api_key = api_key
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def geocode_batch(self, addresses):
+        try:
+            response = self.session.post(
+                GEOCODIO_BATCH_URL,
+                params={"api_key": self.api_key, "limit": 1},
+                json=list(addresses),
+                timeout=self.timeout
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise RetryableError(str(e)) from e
+        if response.status_code == 429 or response.status_code >= 500:
+            raise RetryableError(f"HTTP {response.status_code}: {response.text[:200]}")
+        response.raise_for_status()
+
+        coords = []
+        for item in response.json()["results"]:
+            results = (item.get("response") or {}).get("results") or []
+            if results:
+                loc = results[0]["location"]
+                coords.append((loc["lat"], loc["lng"]))
+            else:
+                coords.append(None)
+        return coords
+
+
+class CsvProvider:
+    """Offline stand-in that answers from an already geocoded CSV (address, latitude, longitude columns)"""
+
+    name = "csv"
+
+    def __init__(self, path, batch_size=GEOCODE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.coordinates = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                address = normalize_address(row.get("address"))
+                if address and row.get("latitude") and row.get("longitude"):
+                    self.coordinates[address] = (float(row["latitude"]), float(row["longitude"]))
+
+    def geocode_batch(self, addresses):
+        return [self.coordinates.get(address) for address in addresses]
+
+
+def get_provider(api_key=None):
+    """Provider picked by GEOCODE_PROVIDER: geocodio (default) or csv (reads GEOCODE_CSV_PATH)"""
+    provider = os.getenv("GEOCODE_PROVIDER", "geocodio")
+    if provider == "csv":
+        return CsvProvider(os.getenv("GEOCODE_CSV_PATH", "../backend/lawyers_geocoded.csv"))
+    if provider == "geocodio":
+        return GeocodioProvider(api_key or os.getenv("GEOCODIO_API_KEY"))
+    raise ValueError(f"Unknown GEOCODE_PROVIDER: {provider}")
+
+
+class Geocoder:
+    """Geocodes many addresses at once: normalize and dedup, answer what the
+    cache knows, and send the rest to the provider in batches from a bounded
+    pool of workers that share one rate limiter and retry transient failures.
+    """
+
+    def __init__(self, provider, cache=None, concurrency=GEOCODE_CONCURRENCY,
+                 rate_limiter=None, retries=GEOCODE_RETRIES):
+        self.provider = provider
+        self.cache = cache if cache is not None else GeocodeCache()
+        self.concurrency = concurrency
+        self.rate_limiter = rate_limiter if rate_limiter is not None else TokenBucket()
+        self.retries = retries
+        self.last_stats = {}
+
+    def _geocode_batch(self, batch):
+        for attempt in range(self.retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                return self.provider.geocode_batch(batch)
+            except RetryableError as e:
+                if attempt == self.retries:
+                    raise
+                delay = 2 ** attempt
+                print(f"Geocoding batch of {len(batch)} failed ({e}); retrying in {delay}s")
+                time.sleep(delay)
+
+    def geocode(self, addresses):
+        """Return {normalized address: (lat, lng) or None} for the given raw addresses"""
+        start = time.perf_counter()
+        addresses = list(addresses)
+        unique = {address for address in map(normalize_address, addresses) if address}
+        results = self.cache.get_many(unique)
+        misses = sorted(unique - results.keys())
+
+        batch_size = self.provider.batch_size
+        batches = [misses[i:i + batch_size] for i in range(0, len(misses), batch_size)]
+        failed = 0
+        if batches:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                futures = {executor.submit(self._geocode_batch, batch): batch for batch in batches}
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    try:
+                        coords = future.result()
+                    except Exception as e:
+                        # Left out of the cache so the next run tries these again
+                        failed += len(batch)
+                        print(f"Failed to geocode batch of {len(batch)}: {e}")
+                        continue
+                    fetched = dict(zip(batch, coords))
+                    self.cache.put_many(fetched, self.provider.name)
+                    results.update(fetched)
+
+        self.last_stats = {
+            "addresses": len(addresses),
+            "unique": len(unique),
+            "cache_hits": len(unique) - len(misses),
+            "requests": len(batches),
+            "failed": failed,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        return results
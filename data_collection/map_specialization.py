@@ -2,9 +2,10 @@ import mysql.connector
 import pandas as pd
 import json
 from pathlib import Path
-from collections import Counter
 from sqlalchemy import create_engine
 
+from bulk_update import bulk_update_by_id, export_csv
+
 # Paths
 BASE_DIR = Path(r"C:\Users\farih\OneDrive\Desktop\560\finalproj")
 CSV_PATH = BASE_DIR / "lawyers_output.csv"
@@ -227,38 +228,51 @@ def create_mapping(specializations):
     
     return mapping
 
-# Step 3: Update MySQL and CSV
+# Step 3: Categorize lawyers
+def categorize_lawyers(df, mapping):
+    """Majority category per lawyer from df's id and specialization columns.
+
+    Ties go to the category whose first specialization is listed first, and
+    lawyers without specializations get "Other".
+    """
+    specs = df.set_index("id")["specialization"].str.split(", ").explode().str.strip()
+    dtype = pd.CategoricalDtype(sorted(set(mapping.values()) | {"Other"}))
+    exploded = pd.DataFrame({
+        "id": specs.index,
+        "category": specs.map(mapping).fillna("Other").astype(dtype).to_numpy(),
+    })
+    exploded["position"] = exploded.groupby("id").cumcount()
+    
+    counts = (exploded.groupby(["id", "category"], observed=True)["position"]
+              .agg(["size", "min"]).reset_index())
+    best = (counts.sort_values(["id", "size", "min"], ascending=[True, False, True])
+            .drop_duplicates("id"))
+    return best.set_index("id")["category"].astype(str).reindex(df["id"], fill_value="Other")
+
+# Step 4: Update MySQL and CSV
 def update_dataset(mapping):
     conn = mysql.connector.connect(**conn_config)
     cursor = conn.cursor()
     
     # Add category column if not exists
-    cursor.execute("ALTER TABLE lawyers ADD COLUMN category VARCHAR(50);")
-    
-    # Update rows
-    cursor.execute("SELECT specialization FROM lawyers;")
-    rows = cursor.fetchall()
-    for row in rows:
-        specs_str = row[0]
-        if specs_str:  # Check for None/NULL
-            specs = [s.strip() for s in specs_str.split(", ")]
-            categories = [mapping.get(spec, "Other") for spec in specs]
-            category = Counter(categories).most_common(1)[0][0] if categories else "Other"
-        else:
-            category = "Other"
-        cursor.execute("UPDATE lawyers SET category = %s WHERE specialization <=> %s;", (category, specs_str))
+    cursor.execute("SHOW COLUMNS FROM lawyers LIKE 'category';")
+    if not cursor.fetchone():
+        cursor.execute("ALTER TABLE lawyers ADD COLUMN category VARCHAR(50);")
     
+    # Update all rows with one join UPDATE keyed by id
+    df = pd.read_sql("SELECT id, specialization FROM lawyers;", engine)
+    categories = categorize_lawyers(df, mapping)
+    rows = list(zip(categories.index.astype(int).tolist(), categories.tolist()))
+    bulk_update_by_id(cursor, "lawyers", {"category": "VARCHAR(50)"}, rows)
     conn.commit()
     
     # Export to CSV
-    query = "SELECT * FROM lawyers;"
-    df = pd.read_sql(query, engine)
-    df.to_csv(OUTPUT_CSV_PATH, index=False)
+    export_csv(cursor, "SELECT * FROM lawyers ORDER BY id;", OUTPUT_CSV_PATH)
     
     cursor.close()
     conn.close()
 
-# Step 4: Prepare for Reddit/documents
+# Step 5: Prepare for Reddit/documents
 def prepare_for_other_datasets(mapping):
     print(f"Mapping saved at {MAPPING_PATH}. Use for Reddit/documents.")
 
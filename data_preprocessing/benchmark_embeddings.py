@@ -0,0 +1,105 @@
+import multiprocessing
+import os
+import resource
+import time
+
+import numpy as np
+
+from embedding_cache import EMBEDDING_MODEL, load_embeddings_model
+
+# Compares the PyTorch and ONNX Runtime backends on real statute text:
+# cosine parity against PyTorch, load time, throughput and peak RSS.
+# Each backend runs in a fresh process so their memory doesn't mix.
+
+SAMPLE_FOLDER = os.getenv("BENCHMARK_TEXT_FOLDER", "../data/processing_data")
+SAMPLE_SIZE = int(os.getenv("BENCHMARK_SAMPLE_SIZE", 512))
+CHUNK_CHARS = 500
+# Below this cosine to the PyTorch vector a backend is flagged as not interchangeable
+PARITY_THRESHOLD = 0.99
+
+BACKENDS = [
+    ("torch", {}),
+    ("onnx", {"ONNX_QUANTIZE": "0"}),
+    ("onnx-int8", {"ONNX_QUANTIZE": "1"}),
+]
+
+
+def load_sample_texts(folder=SAMPLE_FOLDER, size=SAMPLE_SIZE):
+    texts = []
+    for filename in sorted(os.listdir(folder)):
+        if not filename.lower().endswith(".txt"):
+            continue
+        with open(os.path.join(folder, filename), "r", encoding="utf-8") as f:
+            text = f.read()
+        for i in range(0, len(text), CHUNK_CHARS):
+            chunk = text[i:i + CHUNK_CHARS].strip()
+            if chunk:
+                texts.append(chunk)
+            if len(texts) >= size:
+                return texts
+    return texts
+
+
+def run_backend(backend, env, texts, model_name):
+    os.environ.update(env)
+    start = time.perf_counter()
+    model = load_embeddings_model(model_name, backend.split("-")[0])
+    load_seconds = time.perf_counter() - start
+
+    model.embed_documents(texts[:8])  # warm-up
+    start = time.perf_counter()
+    vectors = model.embed_documents(texts)
+    embed_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for text in texts[:50]:
+        model.embed_query(text)
+    query_ms = (time.perf_counter() - start) / min(len(texts), 50) * 1000
+
+    return {
+        "vectors": np.asarray(vectors, dtype=np.float32),
+        "load_seconds": load_seconds,
+        "texts_per_second": len(texts) / embed_seconds,
+        "query_ms": query_ms,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+
+def cosine_rows(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def main():
+    texts = load_sample_texts()
+    if not texts:
+        print(f"❌ No .txt files to sample in {SAMPLE_FOLDER}")
+        return
+    print(f"Benchmarking {EMBEDDING_MODEL} on {len(texts)} chunks")
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for backend, env in BACKENDS:
+        with context.Pool(1) as pool:
+            try:
+                results[backend] = pool.apply(run_backend, (backend, env, texts, EMBEDDING_MODEL))
+            except Exception as e:
+                print(f"❌ {backend} failed: {e}")
+
+    reference = results.get("torch")
+    print(f"{'backend':<10} {'load s':>7} {'texts/s':>9} {'query ms':>9} {'peak RSS MB':>12} {'min cos':>8} {'mean cos':>9}")
+    for backend, result in results.items():
+        parity = ""
+        if reference is not None:
+            cosines = cosine_rows(result["vectors"], reference["vectors"])
+            parity = f"{cosines.min():>8.4f} {cosines.mean():>9.4f}"
+            if cosines.min() < PARITY_THRESHOLD:
+                parity += "  ⚠️ below parity threshold"
+        print(f"{backend:<10} {result['load_seconds']:>7.2f} {result['texts_per_second']:>9.1f} "
+              f"{result['query_ms']:>9.2f} {result['peak_rss_mb']:>12.0f} {parity}")
+
+
+if __name__ == "__main__":
+    main()
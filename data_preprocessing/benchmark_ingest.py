@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from embedding import get_text_chunks, split_by_page
+from embedding_cache import EMBEDDING_BACKEND, CachedEmbeddings, cache_model_name, get_cached_embeddings
+from embedding_scheduler import EMBED_BATCH_SIZE, EMBED_PROCESSES, EmbeddingScheduler
+from local_vector_store import LocalVectorStore
+from pdf_reader import read_page
+
+# Offline ingest benchmark: times each stage of pdf_reader.py + embedding.py on
+# synthetic PDFs and any sample PDFs, and writes the results to JSON so runs can
+# be compared across commits. Needs no network access once the model is cached.
+
+SAMPLE_PDF_FOLDERS = [".", "../data/law_code"]
+SYNTHETIC_PDFS = int(os.getenv("BENCHMARK_SYNTHETIC_PDFS", 3))
+SYNTHETIC_PAGES = int(os.getenv("BENCHMARK_SYNTHETIC_PAGES", 200))
+MAX_SAMPLE_PDFS = int(os.getenv("BENCHMARK_MAX_SAMPLE_PDFS", 5))
+# "model" embeds with the real EMBEDDING_BACKEND from the local Hugging Face cache;
+# "hash" swaps in a cheap deterministic stand-in for a quick smoke run
+BENCHMARK_EMBEDDINGS = os.getenv("BENCHMARK_EMBEDDINGS", "model")
+OUTPUT_FOLDER = os.getenv("BENCHMARK_OUTPUT_FOLDER", "../data/benchmarks")
+UPSERT_BATCH_SIZE = 1000
+
+STATUTE_WORDS = (
+    "section subdivision trustee beneficiary settlor decedent estate probate court petition "
+    "notice property interest shall may pursuant to this chapter except as provided in "
+    "the personal representative distribution will codicil testamentary instrument heir"
+).split()
+
+
+class HashingEmbeddings:
+    """Deterministic bag-of-words vectors, cheap enough not to dominate the timings"""
+
+    def __init__(self, dimension=384):
+        self.dimension = dimension
+
+    def embed_documents(self, texts):
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.split():
+                digest = hashlib.blake2b(word.encode("utf-8"), digest_size=4).digest()
+                vectors[row, int.from_bytes(digest, "little") % self.dimension] += 1.0
+        return vectors.tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def make_synthetic_pdfs(folder, count=SYNTHETIC_PDFS, pages=SYNTHETIC_PAGES):
+    rng = np.random.default_rng(0)
+    paths = []
+    for n in range(count):
+        path = os.path.join(folder, f"Title {n} - Synthetic.pdf")
+        with fitz.open() as pdf:
+            for page_number in range(pages):
+                page = pdf.new_page()
+                words = rng.choice(STATUTE_WORDS, size=450)
+                text = f"§ {n}.{page_number}. " + " ".join(words)
+                page.insert_textbox(fitz.Rect(50, 50, 560, 790), text, fontsize=9)
+            pdf.save(path)
+        paths.append(path)
+    return paths
+
+
+def sample_pdfs():
+    paths = []
+    for folder in SAMPLE_PDF_FOLDERS:
+        if os.path.isdir(folder):
+            paths += [os.path.join(folder, f) for f in sorted(os.listdir(folder)) if f.lower().endswith(".pdf")]
+    return paths[:MAX_SAMPLE_PDFS]
+
+
+def embeddings_info(workers):
+    if BENCHMARK_EMBEDDINGS == "hash":
+        return {"mode": "hash", "backend": "hash", "model": "hashing-stand-in", "workers": 0}
+    return {"mode": "model", "backend": EMBEDDING_BACKEND, "model": cache_model_name(), "workers": workers}
+
+
+def make_scheduler(cache_path, workers):
+    """EmbeddingScheduler over CachedEmbeddings, as embedding.py builds it, with a cold cache at cache_path"""
+    if BENCHMARK_EMBEDDINGS == "hash":
+        embeddings = CachedEmbeddings(HashingEmbeddings(), model_name="hashing-stand-in", path=cache_path)
+        return EmbeddingScheduler(embeddings, batch_size=EMBED_BATCH_SIZE, workers=0)
+    # Never reach out to the Hub; the model has to be in the local cache already
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    # Worker processes build their own CachedEmbeddings from the environment
+    os.environ["EMBEDDING_CACHE_PATH"] = cache_path
+    embeddings = get_cached_embeddings(path=cache_path) if workers == 0 else None
+    return EmbeddingScheduler(embeddings, batch_size=EMBED_BATCH_SIZE, workers=workers)
+
+
+def stage(name, seconds, count, unit):
+    result = {
+        "stage": name,
+        "seconds": round(seconds, 4),
+        unit: count,
+        f"{unit}_per_second": round(count / seconds, 1) if seconds else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+    print(f"  {name:<16} {count:>8} {unit:<7} {seconds:>8.3f}s  "
+          f"{result[f'{unit}_per_second'] or 0:>10.1f} {unit}/s  peak RSS {result['peak_rss_mb']:.0f} MB")
+    return result
+
+
+def run_corpus(name, pdf_paths, workers):
+    print(f"{name}: {len(pdf_paths)} PDFs")
+    stages = []
+
+    start = time.perf_counter()
+    documents = [read_page(path) or [] for path in pdf_paths]
+    page_count = sum(len(pages) for pages in documents)
+    stages.append(stage("read_page", time.perf_counter() - start, page_count, "pages"))
+
+    # Same [Page N] layout store_text_to_file() writes for embedding.py
+    texts = ["".join(f"[Page {p['page_number']}]\n{p['text']}\n\n" for p in pages) for pages in documents]
+    start = time.perf_counter()
+    pages = [page for text in texts for page in split_by_page(text)]
+    stages.append(stage("split_by_page", time.perf_counter() - start, len(pages), "pages"))
+
+    start = time.perf_counter()
+    chunks = [(page_num, chunk) for page_num, page_text in pages for chunk in get_text_chunks(page_text)]
+    stages.append(stage("get_text_chunks", time.perf_counter() - start, len(chunks), "chunks"))
+
+    with tempfile.TemporaryDirectory() as cache_folder:
+        scheduler = make_scheduler(os.path.join(cache_folder, "embedding_cache.sqlite"), workers)
+        start = time.perf_counter()
+        vectors = [vector for _, vector, _ in scheduler.embed((i, chunk, None) for i, (_, chunk) in enumerate(chunks))]
+        embedding = stage("embedding", time.perf_counter() - start, len(vectors), "chunks")
+        embedding["scheduler"] = scheduler.stats()
+        if scheduler.embeddings_model is not None:
+            embedding["cache"] = scheduler.embeddings_model.stats()
+        stages.append(embedding)
+
+    index = LocalVectorStore()
+    upserts = [(f"{name}_p{page_num}_{i}", vector, {"page": page_num, "chunk_text": chunk})
+               for i, ((page_num, chunk), vector) in enumerate(zip(chunks, vectors))]
+    start = time.perf_counter()
+    for i in range(0, len(upserts), UPSERT_BATCH_SIZE):
+        index.upsert(vectors=upserts[i:i + UPSERT_BATCH_SIZE], namespace="benchmark")
+    stages.append(stage("upsert", time.perf_counter() - start, len(upserts), "chunks"))
+
+    total = sum(s["seconds"] for s in stages)
+    return {
+        "corpus": name,
+        "pdfs": len(pdf_paths),
+        "pages": page_count,
+        "chunks": len(chunks),
+        "stages": stages,
+        "total_seconds": round(total, 4),
+        "pages_per_second": round(page_count / total, 1) if total else None,
+        "chunks_per_second": round(len(chunks) / total, 1) if total else None
+    }
+
+
+def main():
+    workers = EMBED_PROCESSES if BENCHMARK_EMBEDDINGS == "model" else 0
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "embeddings": embeddings_info(workers),
+        "embed_batch_size": EMBED_BATCH_SIZE,
+        "cpu_count": os.cpu_count(),
+        "corpora": []
+    }
+
+    with tempfile.TemporaryDirectory() as folder:
+        results["corpora"].append(run_corpus("synthetic", make_synthetic_pdfs(folder), workers))
+    samples = sample_pdfs()
+    if samples:
+        results["corpora"].append(run_corpus("sample", samples, workers))
+    results["peak_rss_mb"] = round(peak_rss_mb(), 1)
+
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    output_path = os.path.join(OUTPUT_FOLDER, f"ingest-{time.strftime('%Y%m%d-%H%M%S')}-{results['commit']}.json")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Saved benchmark results to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+# Keeps section numbers like "6240" or "1.2.3" and hyphenated terms like "pour-over" whole
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+
+
+def tokenize(text):
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        # Also index the parts, so "pour over" still matches "pour-over"
+        if "-" in token or "." in token:
+            tokens.extend(part for part in re.split(r"[.\-]", token) if part)
+    return tokens
+
+
+class BM25Index:
+    """Lexical BM25 index over text chunks, for exact terms and section numbers.
+
+    Chunks are kept by id (with their metadata), so the index can be updated
+    and saved incrementally; postings are rebuilt lazily on the next search
+    after a change.
+    """
+
+    def __init__(self, k1=1.5, b=0.75, text_key="chunk_text"):
+        self.k1 = k1
+        self.b = b
+        self.text_key = text_key
+        self.docs = {}
+        self.lock = threading.Lock()
+        self._built = None
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, doc_id, text, metadata=None):
+        with self.lock:
+            self.docs[doc_id] = {**(metadata or {}), self.text_key: text}
+            self._built = None
+
+    def delete(self, ids):
+        with self.lock:
+            for doc_id in ids:
+                self.docs.pop(doc_id, None)
+            self._built = None
+
+    def upsert(self, vectors, namespace=None):
+        # Same record shapes as a Pinecone upsert, so ingest can feed both
+        for item in vectors:
+            if isinstance(item, dict):
+                doc_id, metadata = item["id"], item.get("metadata", {})
+            else:
+                doc_id, metadata = item[0], item[2] if len(item) > 2 else {}
+            self.add(doc_id, metadata.get(self.text_key, ""), metadata)
+
+    def _build(self):
+        ids = list(self.docs)
+        postings = {}
+        doc_lengths = np.zeros(len(ids), dtype=np.float32)
+        for i, doc_id in enumerate(ids):
+            tokens = tokenize(self.docs[doc_id][self.text_key])
+            doc_lengths[i] = len(tokens)
+            for term, count in Counter(tokens).items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(i)
+                postings[term][1].append(count)
+
+        n = len(ids)
+        avg_length = float(doc_lengths.mean()) if n else 0.0
+        avg_length = avg_length or 1.0
+        terms = {}
+        for term, (doc_indices, counts) in postings.items():
+            idf = math.log(1 + (n - len(doc_indices) + 0.5) / (len(doc_indices) + 0.5))
+            terms[term] = (np.array(doc_indices, dtype=np.int64), np.array(counts, dtype=np.float32), idf)
+
+        # Length normalization term of BM25, precomputed per document
+        norms = self.k1 * (1 - self.b + self.b * doc_lengths / avg_length)
+        return {"ids": ids, "metadata": [self.docs[doc_id] for doc_id in ids], "terms": terms, "norms": norms}
+
+    def build(self):
+        with self.lock:
+            if self._built is None:
+                self._built = self._build()
+            return self._built
+
+    def search(self, query, k=10):
+        """Return up to k (id, score, metadata) tuples, best first"""
+        built = self.build()
+
+        if not built["ids"]:
+            return []
+        scores = np.zeros(len(built["ids"]), dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in built["terms"]:
+                continue
+            doc_indices, counts, idf = built["terms"][term]
+            scores[doc_indices] += idf * counts * (self.k1 + 1) / (counts + built["norms"][doc_indices])
+
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched])]
+        return [(built["ids"][i], float(scores[i]), dict(built["metadata"][i])) for i in matched]
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self.lock:
+            with open(path, "w", encoding="utf-8") as f:
+                for doc_id, metadata in self.docs.items():
+                    f.write(json.dumps({"id": doc_id, "metadata": metadata}) + "\n")
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        index = cls(**kwargs)
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    index.docs[record["id"]] = record["metadata"]
+        return index
+
+
+def load_bm25_indexes(folder):
+    """Load every <namespace>.jsonl file in folder into a {namespace: BM25Index} dict"""
+    indexes = {}
+    if os.path.isdir(folder):
+        for filename in os.listdir(folder):
+            if filename.endswith(".jsonl"):
+                indexes[filename[:-len(".jsonl")]] = BM25Index.load(os.path.join(folder, filename))
+    return indexes
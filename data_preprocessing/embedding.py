@@ -1,5 +1,11 @@
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
+from pinecone import Pinecone
+from embedding_cache import get_cached_embeddings
+from local_vector_store import LocalVectorStore
+from bm25_index import BM25Index
+from index_manifest import IndexManifest, content_hash
+from embedding_scheduler import EMBED_PROCESSES, EmbeddingScheduler
+from namespace_generations import NamespaceGenerations
 import os
 from dotenv import load_dotenv
 import re
@@ -9,9 +15,14 @@ from tqdm import tqdm
 load_dotenv("../.env")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 
-# Connect to Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index("llm")
+# Set LEGAL_NAMESPACE=california_law_code to build the namespace the backend queries
+NAMESPACE = os.getenv("LEGAL_NAMESPACE", "federal_law_code")
+SOURCE_URL = "https://uscode.house.gov/download/download.shtml"
+
+def get_pinecone_index():
+    # Connect to Pinecone only when it is the target, so local index builds work offline
+    pc = Pinecone(api_key=PINECONE_API_KEY)
+    return pc.Index("llm")
 
 
 def get_text_chunks(text):
@@ -49,59 +60,161 @@ def extract_specialization_from_filename(filename):
     return "default"  
 
 
-def process_embedding(input_folder):
-    embeddings_model = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
-    )
-
-    for text_file in os.listdir(input_folder):
-        if text_file.lower().endswith(".txt"):
-            file_path = os.path.join(input_folder, text_file)
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    full_text = f.read()
-
-                pages = split_by_page(full_text)
-                specialization = extract_specialization_from_filename(text_file)
-                namespace = "federal_law_code"
-                source = "https://uscode.house.gov/download/download.shtml"
-
-                upserts = []
-
-                for page_num, page_text in tqdm(pages, desc=f"  → Pages of {text_file}", leave=False):
-                    chunks = get_text_chunks(page_text)
-                    embeddings = embeddings_model.embed_documents(chunks)
-
-                    for i, chunk in enumerate(chunks):
-                        doc_id = f"{text_file}_p{page_num}_{i}"
-                        upserts.append({
-                            "id": doc_id,
-                            "values": embeddings[i],
-                            "metadata": {
-                                "source": source,
-                                "page": page_num,
-                                "specialization": specialization,
-                                "chunk_text": chunk
-                            }
-                        })
-
-                pinecone_vectors = [
-                    (item["id"], item["values"], item["metadata"]) for item in upserts
-                ]
-
-                for batch in chunk_list(pinecone_vectors, chunk_size=1000):
-                    index.upsert(vectors=batch, namespace=namespace)
-
-                print(f"✅ Processed and upserted: {text_file} into namespace: {namespace}")
-            except Exception as e:
-                print(f"❌ Failed to process {text_file}: {e}")
+def delete_vectors(index, ids, namespace, bm25_index=None):
+    for batch in chunk_list(ids, chunk_size=1000):
+        index.delete(ids=batch, namespace=namespace)
+    if bm25_index is not None and ids:
+        bm25_index.delete(ids)
+
+
+def flush_pages(index, manifest, upserts, page_records, namespace, bm25_index=None):
+    """Upsert the pending vectors, drop IDs the new pages no longer produce, then record the pages"""
+    for batch in chunk_list(upserts, chunk_size=1000):
+        index.upsert(vectors=batch, namespace=namespace)
+    if bm25_index is not None:
+        bm25_index.upsert(upserts)
+
+    stale_ids = [vid for *_, stale in page_records for vid in stale]
+    delete_vectors(index, stale_ids, namespace, bm25_index)
+    manifest.record_pages(namespace, [record[:4] for record in page_records])
+
+
+def iter_changed_chunks(input_folder, text_files, manifest, namespace, source):
+    """Yield (doc_id, chunk, metadata) for every changed page, plus a (None, None, marker)
+    item after each page and each file so the caller knows when they are fully embedded"""
+    for text_file in text_files:
+        file_path = os.path.join(input_folder, text_file)
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                full_text = f.read()
+        except Exception as e:
+            print(f"❌ Failed to process {text_file}: {e}")
+            continue
+
+        file_hash = content_hash(full_text)
+        if manifest.is_current(namespace, text_file, file_hash):
+            print(f"⏭️ Unchanged, skipped: {text_file}")
+            continue
+        manifest.start_file(namespace, text_file, file_hash)
+
+        indexed_pages = manifest.pages(namespace, text_file)
+        pages = split_by_page(full_text)
+        specialization = extract_specialization_from_filename(text_file)
+        skipped = 0
+
+        for page_num, page_text in tqdm(pages, desc=f"  → Pages of {text_file}", leave=False):
+            page_hash = content_hash(page_text)
+            previous_hash, previous_ids = indexed_pages.get(page_num, (None, []))
+            if page_hash == previous_hash:
+                skipped += 1
+                continue
+
+            page_ids = []
+            for i, chunk in enumerate(get_text_chunks(page_text)):
+                doc_id = f"{text_file}_p{page_num}_{i}"
+                page_ids.append(doc_id)
+                yield doc_id, chunk, {
+                    "source": source,
+                    "page": page_num,
+                    "specialization": specialization,
+                    "chunk_text": chunk
+                }
+            yield None, None, {"page": (text_file, page_num, page_hash, page_ids, sorted(set(previous_ids) - set(page_ids)))}
+
+        # Pages that no longer exist in the file
+        current_pages = {page_num for page_num, _ in pages}
+        removed_pages = {page: ids for page, (_, ids) in indexed_pages.items() if page not in current_pages}
+        yield None, None, {"file": text_file, "removed_pages": removed_pages,
+                           "embedded": len(pages) - skipped, "skipped": skipped}
+
+
+def process_embedding(input_folder, index=None, bm25_index=None, manifest=None, workers=EMBED_PROCESSES,
+                      generations=None):
+    if index is None:
+        index = get_pinecone_index()
+    if manifest is None:
+        manifest = IndexManifest()
+    if generations is None:
+        # Bumped after every write so the server drops retrievals cached for this namespace
+        generations = NamespaceGenerations()
+
+    # Cached on disk, so re-running after small edits only embeds changed chunks.
+    # Chunks from consecutive pages and files are embedded together in full batches.
+    scheduler = EmbeddingScheduler(get_cached_embeddings() if workers == 0 else None, workers=workers)
+    namespace = NAMESPACE
+    source = SOURCE_URL
+
+    text_files = sorted(f for f in os.listdir(input_folder) if f.lower().endswith(".txt"))
+
+    # Titles removed from the folder since the last run
+    for text_file in sorted(set(manifest.filenames(namespace)) - set(text_files)):
+        stale_ids = manifest.remove_file(namespace, text_file)
+        delete_vectors(index, stale_ids, namespace, bm25_index)
+        generations.bump(namespace)
+        print(f"🗑️ Deleted {len(stale_ids)} vectors for removed file: {text_file}")
+
+    upserts = []
+    page_records = []
+    for doc_id, vector, info in scheduler.embed(iter_changed_chunks(input_folder, text_files, manifest, namespace, source)):
+        if doc_id is not None:
+            upserts.append((doc_id, vector, info))
+        elif "page" in info:
+            page_records.append(info["page"])
+        else:
+            text_file = info["file"]
+            flush_pages(index, manifest, upserts, page_records, namespace, bm25_index)
+            upserts, page_records = [], []
+
+            removed_ids = [vid for ids in info["removed_pages"].values() for vid in ids]
+            delete_vectors(index, removed_ids, namespace, bm25_index)
+            manifest.remove_pages(namespace, text_file, info["removed_pages"])
+            manifest.finish_file(namespace, text_file)
+            generations.bump(namespace)
+            print(f"✅ Processed and upserted: {text_file} into namespace: {namespace} "
+                  f"({info['embedded']} pages embedded, {info['skipped']} unchanged, "
+                  f"{len(info['removed_pages'])} removed)")
+            continue
+
+        # Record progress every batch so a crash only repeats the last few pages
+        if len(upserts) >= 1000:
+            flush_pages(index, manifest, upserts, page_records, namespace, bm25_index)
+            generations.bump(namespace)
+            upserts, page_records = [], []
+
+    stats = scheduler.stats()
+    print(f"⏱️ Embedded {stats['chunks']} chunks in {stats['batches']} batches of up to {scheduler.batch_size} "
+          f"{f'across {workers} worker processes' if workers else 'in process'}: {stats['chunks_per_second']} chunks/s "
+          f"({stats['embed_seconds']}s embedding of {stats['wall_seconds']}s total)")
 
 
 def main():
     data_folder = "../data"
     input_folder = os.path.join(data_folder, "processing_data")
-    process_embedding(input_folder)
 
+    # Set BM25_INDEX_PATH to also build the lexical index used for hybrid retrieval
+    bm25_index_path = os.getenv("BM25_INDEX_PATH")
+    bm25_file = os.path.join(bm25_index_path, f"{NAMESPACE}.jsonl") if bm25_index_path else None
+    bm25_index = BM25Index.load(bm25_file) if bm25_file else None
+
+    # Set LOCAL_INDEX_PATH to build an offline index for VECTOR_BACKEND=local instead of Pinecone
+    local_index_path = os.getenv("LOCAL_INDEX_PATH")
+    # Local and BM25 indexes are only written at the end of a run, so their manifest is
+    # committed after they are saved; Pinecone-only runs record progress page by page
+    autocommit = not (local_index_path or bm25_file)
+    if local_index_path:
+        manifest = IndexManifest(os.path.join(local_index_path, "manifest.sqlite"), autocommit=autocommit)
+        local_index = LocalVectorStore.load(local_index_path, mmap=False)
+        process_embedding(input_folder, index=local_index, bm25_index=bm25_index, manifest=manifest)
+        local_index.save(local_index_path)
+        print(f"✅ Saved local index to {local_index_path}")
+    else:
+        manifest = IndexManifest(autocommit=autocommit)
+        process_embedding(input_folder, bm25_index=bm25_index, manifest=manifest)
+
+    if bm25_index is not None:
+        bm25_index.save(bm25_file)
+        print(f"✅ Saved BM25 index to {bm25_file}")
+    manifest.commit()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,143 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# "torch" runs the model through HuggingFaceEmbeddings, "onnx" through ONNX Runtime (see onnx_embeddings.py)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+DEFAULT_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "embedding_cache.sqlite")
+)
+# SQLite limits the number of bound parameters per statement
+LOOKUP_BATCH_SIZE = 500
+# Query embeddings are kept in memory only, least recently used first out
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", 10000))
+
+
+def cache_key(model_name, text):
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an embeddings model with an on-disk cache keyed by model name + text.
+
+    Document vectors are stored as float32 blobs in SQLite, so ingest jobs and
+    the Flask server can point at the same file and never embed the same chunk
+    twice. Query vectors go to a bounded in-memory LRU instead, so user
+    questions are never written to disk and a miss costs no commit.
+    """
+
+    def __init__(self, embeddings, model_name=EMBEDDING_MODEL, path=DEFAULT_CACHE_PATH,
+                 query_cache_size=QUERY_CACHE_MAX_ENTRIES):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.path = path
+        self.query_cache_size = query_cache_size
+        self.query_cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL;")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL);")
+        self.conn.commit()
+
+    def _lookup(self, keys):
+        found = {}
+        keys = list(keys)
+        with self.lock:
+            for i in range(0, len(keys), LOOKUP_BATCH_SIZE):
+                batch = keys[i:i + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders});", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def _store(self, items):
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?);",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items]
+            )
+            self.conn.commit()
+
+    def _embed(self, texts, model_name, embed_missing):
+        keys = [cache_key(model_name, text) for text in texts]
+        found = self._lookup(set(keys))
+
+        # Embed each missing text once, even if it repeats within the batch
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            vectors = embed_missing(list(missing.values()))
+            items = list(zip(missing.keys(), vectors))
+            self._store(items)
+            for key, vector in items:
+                found[key] = list(vector)
+
+        return [found[key] for key in keys]
+
+    def embed_documents(self, texts):
+        return self._embed(texts, self.model_name, self.embeddings.embed_documents)
+
+    def embed_query(self, text):
+        # Queries are cached separately from documents in case the model embeds them differently
+        with self.lock:
+            vector = self.query_cache.get(text)
+            if vector is not None:
+                self.query_cache.move_to_end(text)
+                self.hits += 1
+                return list(vector)
+
+        vector = list(self.embeddings.embed_query(text))
+        with self.lock:
+            self.misses += 1
+            self.query_cache[text] = vector
+            while len(self.query_cache) > self.query_cache_size:
+                self.query_cache.popitem(last=False)
+        return list(vector)
+
+    def stats(self):
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM embeddings;").fetchone()[0]
+            return {"entries": entries, "query_entries": len(self.query_cache), "hits": self.hits, "misses": self.misses}
+
+
+def load_embeddings_model(model_name=EMBEDDING_MODEL, backend=EMBEDDING_BACKEND):
+    if backend == "onnx":
+        from onnx_embeddings import OnnxEmbeddings
+
+        return OnnxEmbeddings(model_name)
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=model_name)
+
+
+def cache_model_name(model_name=EMBEDDING_MODEL, backend=EMBEDDING_BACKEND):
+    if backend == "onnx":
+        from onnx_embeddings import ONNX_QUANTIZE
+
+        # ONNX (and especially int8) vectors differ slightly, so they get their own cache entries
+        return f"{model_name}:onnx{'-int8' if ONNX_QUANTIZE else ''}"
+    return model_name
+
+
+def get_cached_embeddings(model_name=EMBEDDING_MODEL, path=DEFAULT_CACHE_PATH, backend=EMBEDDING_BACKEND):
+    return CachedEmbeddings(load_embeddings_model(model_name, backend),
+                            model_name=cache_model_name(model_name, backend), path=path)
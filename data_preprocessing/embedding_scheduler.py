@@ -0,0 +1,117 @@
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from embedding_cache import EMBEDDING_MODEL, get_cached_embeddings
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 64))
+# 0 embeds in this process; more runs that many model copies in worker processes
+EMBED_PROCESSES = int(os.getenv("EMBED_PROCESSES", 0))
+
+_worker_model = None
+
+
+def _init_worker(model_name, threads):
+    global _worker_model
+    try:
+        import torch
+        # Otherwise every worker's torch uses all cores and they fight over them
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_model = get_cached_embeddings(model_name)
+
+
+def _embed_in_worker(texts):
+    return _worker_model.embed_documents(texts)
+
+
+class EmbeddingScheduler:
+    """Embeds a stream of (doc_id, text, metadata) items in fixed-size batches.
+
+    Chunks from many pages and files share a batch, so the model always sees
+    batch_size texts at a time. Results come back in input order as
+    (doc_id, vector, metadata). Items with text None are not embedded but are
+    passed through in order, so callers can mark where a page or file ends.
+    """
+
+    def __init__(self, embeddings_model=None, batch_size=EMBED_BATCH_SIZE, workers=EMBED_PROCESSES,
+                 model_name=EMBEDDING_MODEL):
+        self.embeddings_model = embeddings_model
+        self.batch_size = batch_size
+        self.workers = workers
+        self.model_name = model_name
+        self.chunks = 0
+        self.batches = 0
+        # Time spent inside the embedding calls, and over the whole run including
+        # whatever the consumer does between results (upserts, manifest writes)
+        self.embed_seconds = 0.0
+        self.wall_seconds = 0.0
+
+    def _timed(self, call, *args):
+        start = time.perf_counter()
+        try:
+            return call(*args)
+        finally:
+            self.embed_seconds += time.perf_counter() - start
+
+    def _run(self, submit, items):
+        # Up to workers + 1 batches are in flight, so a worker is never idle waiting for the next one
+        max_in_flight = self.workers + 1
+        in_flight = deque()
+        batch, texts = [], []
+
+        def completed(entry):
+            batch, result = entry
+            vectors = iter(self._timed(result.result) if hasattr(result, "result") else result)
+            for doc_id, text, metadata in batch:
+                yield doc_id, (next(vectors) if text is not None else None), metadata
+
+        for doc_id, text, metadata in items:
+            batch.append((doc_id, text, metadata))
+            if text is None:
+                continue
+            texts.append(text)
+            if len(texts) >= self.batch_size:
+                in_flight.append((batch, self._timed(submit, texts)))
+                self.chunks += len(texts)
+                self.batches += 1
+                batch, texts = [], []
+                while len(in_flight) >= max_in_flight:
+                    yield from completed(in_flight.popleft())
+
+        if batch:
+            in_flight.append((batch, self._timed(submit, texts) if texts else []))
+            self.chunks += len(texts)
+            self.batches += 1 if texts else 0
+        while in_flight:
+            yield from completed(in_flight.popleft())
+
+    def embed(self, items):
+        start = time.perf_counter()
+        try:
+            if self.workers > 0:
+                threads = max(1, (os.cpu_count() or 1) // self.workers)
+                with ProcessPoolExecutor(max_workers=self.workers,
+                                         mp_context=multiprocessing.get_context("spawn"),
+                                         initializer=_init_worker,
+                                         initargs=(self.model_name, threads)) as executor:
+                    yield from self._run(lambda texts: executor.submit(_embed_in_worker, texts), items)
+            else:
+                if self.embeddings_model is None:
+                    self.embeddings_model = get_cached_embeddings(self.model_name)
+                yield from self._run(self.embeddings_model.embed_documents, items)
+        finally:
+            self.wall_seconds += time.perf_counter() - start
+
+    def stats(self):
+        """chunks_per_second is embedding throughput alone; wall_seconds also covers the consumer"""
+        return {
+            "chunks": self.chunks,
+            "batches": self.batches,
+            "embed_seconds": round(self.embed_seconds, 2),
+            "wall_seconds": round(self.wall_seconds, 2),
+            "chunks_per_second": round(self.chunks / self.embed_seconds, 1) if self.embed_seconds else 0.0
+        }
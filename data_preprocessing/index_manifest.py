@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+DEFAULT_MANIFEST_PATH = os.getenv(
+    "INDEX_MANIFEST_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "index_manifest.sqlite")
+)
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class IndexManifest:
+    """Records what embedding.py has written to an index: a hash per file and
+    per page, and the vector IDs each page produced.
+
+    Reruns use it to skip unchanged files and pages and to find the IDs to
+    delete when a page shrinks or disappears. Pages are recorded as soon as
+    their vectors are upserted, so a crash mid-title resumes where it stopped.
+    With autocommit=False nothing is durable until commit(), for indexes that
+    are only saved at the end of a run.
+    """
+
+    def __init__(self, path=DEFAULT_MANIFEST_PATH, autocommit=True):
+        self.path = path
+        self.autocommit = autocommit
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL;")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                namespace TEXT,
+                filename TEXT,
+                file_hash TEXT,
+                complete INTEGER,
+                PRIMARY KEY (namespace, filename)
+            );
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                namespace TEXT,
+                filename TEXT,
+                page INTEGER,
+                page_hash TEXT,
+                vector_ids TEXT,
+                PRIMARY KEY (namespace, filename, page)
+            );
+        """)
+        self.conn.commit()
+
+    def _changed(self):
+        if self.autocommit:
+            self.conn.commit()
+
+    def commit(self):
+        with self.lock:
+            self.conn.commit()
+
+    def filenames(self, namespace):
+        with self.lock:
+            return [r[0] for r in self.conn.execute(
+                "SELECT filename FROM files WHERE namespace = ?;", (namespace,)
+            )]
+
+    def is_current(self, namespace, filename, file_hash):
+        """True if the file was fully indexed with exactly this content"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT file_hash, complete FROM files WHERE namespace = ? AND filename = ?;",
+                (namespace, filename)
+            ).fetchone()
+        return row is not None and row[0] == file_hash and bool(row[1])
+
+    def pages(self, namespace, filename):
+        """Return {page: (page_hash, vector_ids)} for the pages already indexed"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT page, page_hash, vector_ids FROM pages WHERE namespace = ? AND filename = ?;",
+                (namespace, filename)
+            ).fetchall()
+        return {page: (page_hash, json.loads(vector_ids)) for page, page_hash, vector_ids in rows}
+
+    def start_file(self, namespace, filename, file_hash):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (namespace, filename, file_hash, complete) VALUES (?, ?, ?, 0);",
+                (namespace, filename, file_hash)
+            )
+            self._changed()
+
+    def finish_file(self, namespace, filename):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE files SET complete = 1 WHERE namespace = ? AND filename = ?;", (namespace, filename)
+            )
+            self._changed()
+
+    def record_pages(self, namespace, pages):
+        """pages is a list of (filename, page, page_hash, vector_ids)"""
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO pages (namespace, filename, page, page_hash, vector_ids) VALUES (?, ?, ?, ?, ?);",
+                [(namespace, filename, page, page_hash, json.dumps(vector_ids))
+                 for filename, page, page_hash, vector_ids in pages]
+            )
+            self._changed()
+
+    def remove_pages(self, namespace, filename, pages):
+        with self.lock:
+            self.conn.executemany(
+                "DELETE FROM pages WHERE namespace = ? AND filename = ? AND page = ?;",
+                [(namespace, filename, page) for page in pages]
+            )
+            self._changed()
+
+    def remove_file(self, namespace, filename):
+        """Forget a file and return every vector ID it had written"""
+        vector_ids = [vid for _, ids in self.pages(namespace, filename).values() for vid in ids]
+        with self.lock:
+            self.conn.execute("DELETE FROM pages WHERE namespace = ? AND filename = ?;", (namespace, filename))
+            self.conn.execute("DELETE FROM files WHERE namespace = ? AND filename = ?;", (namespace, filename))
+            self._changed()
+        return vector_ids
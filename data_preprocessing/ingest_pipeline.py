@@ -0,0 +1,191 @@
+import os
+import queue
+import threading
+
+from dotenv import load_dotenv
+from tqdm import tqdm
+
+from bm25_index import BM25Index
+from embedding import (
+    NAMESPACE,
+    SOURCE_URL,
+    extract_specialization_from_filename,
+    get_pinecone_index,
+    get_text_chunks,
+)
+from embedding_cache import get_cached_embeddings
+from embedding_scheduler import EMBED_BATCH_SIZE, EMBED_PROCESSES, EmbeddingScheduler
+from local_vector_store import LocalVectorStore
+from namespace_generations import NamespaceGenerations
+from pdf_reader import iter_pages
+
+load_dotenv("../.env")
+
+# Items waiting between two stages; this is what keeps memory flat for any title size
+QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 256))
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", 500))
+
+_DONE = object()
+
+
+def _put(q, item, stop):
+    # Give up if another stage failed, so a full queue can't block forever
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _drain(q, stop):
+    while not stop.is_set():
+        try:
+            item = q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if item is _DONE:
+            return
+        yield item
+
+
+def run_pipeline(source, stages, queue_size=QUEUE_SIZE):
+    """Run generator stages concurrently, each in its own thread, joined by bounded queues.
+
+    source is any iterable; each stage takes an iterator of the previous
+    stage's items and yields its own. Yields the last stage's items and
+    re-raises the first error from any stage.
+    """
+    stop = threading.Event()
+    errors = []
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+
+    def run(items, out_queue):
+        try:
+            for item in items:
+                if not _put(out_queue, item, stop):
+                    return
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+            return
+        _put(out_queue, _DONE, stop)
+
+    threads = [threading.Thread(target=run, args=(source, queues[0]), name="pipeline-source", daemon=True)]
+    for i, stage in enumerate(stages):
+        items = stage(_drain(queues[i], stop))
+        threads.append(threading.Thread(target=run, args=(items, queues[i + 1]),
+                                        name=f"pipeline-{stage.__name__}", daemon=True))
+    for thread in threads:
+        thread.start()
+
+    try:
+        yield from _drain(queues[-1], stop)
+    finally:
+        # Unblocks the other stages if the caller stopped reading early
+        stop.set()
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+
+
+def iter_pdf_pages(pdf_folder, failures):
+    for filename in sorted(f for f in os.listdir(pdf_folder) if f.endswith(".pdf")):
+        try:
+            for page in iter_pages(os.path.join(pdf_folder, filename)):
+                yield filename, page["page_number"], page["text"]
+        except Exception as e:
+            failures.append((filename, str(e)))
+            print(f"❌ Failed to read {filename}: {e}")
+
+
+def chunk_pages(pages):
+    for filename, page_num, page_text in pages:
+        # Same IDs as embedding.py, which named vectors after the extracted .txt file
+        text_file = os.path.splitext(filename)[0] + ".txt"
+        specialization = extract_specialization_from_filename(text_file)
+        for i, chunk in enumerate(get_text_chunks(page_text)):
+            yield f"{text_file}_p{page_num}_{i}", chunk, {
+                "source": SOURCE_URL,
+                "page": page_num,
+                "specialization": specialization,
+                "chunk_text": chunk
+            }
+
+
+def make_embed_stage(scheduler):
+    def embed_chunks(chunks):
+        # (doc_id, text, metadata) in, (doc_id, vector, metadata) out, batched across pages and files
+        yield from scheduler.embed(chunks)
+    return embed_chunks
+
+
+def make_upsert_stage(index, namespace=NAMESPACE, batch_size=UPSERT_BATCH_SIZE, bm25_index=None, generations=None):
+    def upsert_vectors(vectors):
+        def flush(batch):
+            index.upsert(vectors=batch, namespace=namespace)
+            if bm25_index is not None:
+                bm25_index.upsert(batch)
+            if generations is not None:
+                generations.bump(namespace)
+            return len(batch)
+
+        batch = []
+        for item in vectors:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield flush(batch)
+                batch = []
+        if batch:
+            yield flush(batch)
+    return upsert_vectors
+
+
+def ingest_pdfs(pdf_folder, index, embeddings_model, namespace=NAMESPACE, bm25_index=None, workers=EMBED_PROCESSES):
+    """Extract, chunk, embed and upsert every PDF in pdf_folder without intermediate text files"""
+    failures = []
+    scheduler = EmbeddingScheduler(embeddings_model if workers == 0 else None, batch_size=EMBED_BATCH_SIZE, workers=workers)
+    stages = [
+        chunk_pages,
+        make_embed_stage(scheduler),
+        make_upsert_stage(index, namespace=namespace, bm25_index=bm25_index, generations=NamespaceGenerations()),
+    ]
+    total = 0
+    with tqdm(desc="Upserted chunks", unit="chunk") as progress:
+        for count in run_pipeline(iter_pdf_pages(pdf_folder, failures), stages):
+            total += count
+            progress.update(count)
+    print(f"✅ Upserted {total} chunks into namespace: {namespace}")
+    stats = scheduler.stats()
+    print(f"⏱️ Embedded {stats['chunks']} chunks in {stats['batches']} batches: {stats['chunks_per_second']} chunks/s "
+          f"({stats['embed_seconds']}s embedding of {stats['wall_seconds']}s total)")
+    return total, failures
+
+
+def main():
+    pdf_folder = os.getenv("LAW_CODE_PDF_FOLDER", "../data/law_code")
+    # Worker processes load their own copy of the model
+    embeddings_model = get_cached_embeddings() if EMBED_PROCESSES == 0 else None
+
+    bm25_index_path = os.getenv("BM25_INDEX_PATH")
+    bm25_file = os.path.join(bm25_index_path, f"{NAMESPACE}.jsonl") if bm25_index_path else None
+    bm25_index = BM25Index.load(bm25_file) if bm25_file else None
+
+    local_index_path = os.getenv("LOCAL_INDEX_PATH")
+    if local_index_path:
+        index = LocalVectorStore.load(local_index_path, mmap=False)
+        ingest_pdfs(pdf_folder, index, embeddings_model, bm25_index=bm25_index)
+        index.save(local_index_path)
+        print(f"✅ Saved local index to {local_index_path}")
+    else:
+        ingest_pdfs(pdf_folder, get_pinecone_index(), embeddings_model, bm25_index=bm25_index)
+
+    if bm25_index is not None:
+        bm25_index.save(bm25_file)
+        print(f"✅ Saved BM25 index to {bm25_file}")
+
+
+if __name__ == "__main__":
+    main()
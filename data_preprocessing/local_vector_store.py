@@ -0,0 +1,300 @@
+import json
+import os
+import shutil
+import threading
+import uuid
+from types import SimpleNamespace
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+DEFAULT_NAMESPACE = "__default__"
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _matches_filter(metadata, filter):
+    # Supports plain equality plus Pinecone's $eq / $ne / $in / $nin operators
+    for field, condition in filter.items():
+        value = metadata.get(field)
+        if isinstance(condition, dict):
+            for op, target in condition.items():
+                if op == "$eq" and value != target:
+                    return False
+                if op == "$ne" and value == target:
+                    return False
+                if op == "$in" and value not in target:
+                    return False
+                if op == "$nin" and value in target:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+class LocalVectorStore(VectorStore):
+    """In-process exact cosine search, usable in place of PineconeVectorStore.
+
+    Vectors are kept per namespace as a normalized float32 matrix which can be
+    saved to disk and memory-mapped back in. It also accepts the same
+    upsert(vectors=..., namespace=...) calls as a Pinecone index, so the ingest
+    scripts can write to it directly.
+    """
+
+    def __init__(self, embedding=None, text_key="chunk_text"):
+        self._embedding = embedding
+        self.text_key = text_key
+        self.namespaces = {}
+        self.lock = threading.Lock()
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def _namespace(self, namespace, create=False):
+        name = namespace or DEFAULT_NAMESPACE
+        if name not in self.namespaces and create:
+            self.namespaces[name] = {"ids": [], "metadata": [], "vectors": None, "buffer": None, "positions": {}}
+        return self.namespaces.get(name)
+
+    # Pinecone index compatible writes
+
+    def upsert(self, vectors, namespace=""):
+        records = []
+        for item in vectors:
+            if isinstance(item, dict):
+                records.append((item["id"], item["values"], item.get("metadata", {})))
+            else:
+                records.append((item[0], item[1], item[2] if len(item) > 2 else {}))
+        if not records:
+            return {"upserted_count": 0}
+
+        # A later record for the same ID wins, as with repeated upserts
+        records = list({vector_id: (vector_id, values, metadata) for vector_id, values, metadata in records}.values())
+        new_vectors = _normalize_rows(np.asarray([values for _, values, _ in records], dtype=np.float32))
+        with self.lock:
+            ns = self._namespace(namespace, create=True)
+            # "vectors" is a view of the first len(ids) rows of "buffer", which grows by doubling
+            # so that appending batch after batch doesn't copy the whole matrix every time
+            buffer = ns.get("buffer")
+            if buffer is None:
+                if ns["vectors"] is None:
+                    buffer = np.empty((0, new_vectors.shape[1]), dtype=np.float32)
+                else:
+                    # Also copies out of a read-only memory-mapped file before writing
+                    buffer = np.array(ns["vectors"], dtype=np.float32)
+
+            count = len(ns["ids"])
+            appended = []
+            for (vector_id, _, metadata), vector in zip(records, new_vectors):
+                position = ns["positions"].get(vector_id)
+                if position is None:
+                    ns["positions"][vector_id] = len(ns["ids"])
+                    ns["ids"].append(vector_id)
+                    ns["metadata"].append(dict(metadata))
+                    appended.append(vector)
+                else:
+                    ns["metadata"][position] = dict(metadata)
+                    buffer[position] = vector
+            if appended:
+                size = count + len(appended)
+                if size > len(buffer):
+                    grown = np.empty((max(size, 2 * len(buffer)), buffer.shape[1]), dtype=np.float32)
+                    grown[:count] = buffer[:count]
+                    buffer = grown
+                buffer[count:size] = appended
+            ns["buffer"] = buffer
+            ns["vectors"] = buffer[:len(ns["ids"])]
+        return {"upserted_count": len(records)}
+
+    def delete(self, ids=None, namespace="", delete_all=False, **kwargs):
+        with self.lock:
+            ns = self._namespace(namespace)
+            if ns is None:
+                return True
+            if delete_all:
+                self.namespaces.pop(namespace or DEFAULT_NAMESPACE)
+                return True
+            drop = {ns["positions"][vector_id] for vector_id in ids or [] if vector_id in ns["positions"]}
+            if not drop:
+                return True
+            keep = [i for i in range(len(ns["ids"])) if i not in drop]
+            ns["ids"] = [ns["ids"][i] for i in keep]
+            ns["metadata"] = [ns["metadata"][i] for i in keep]
+            ns["vectors"] = np.asarray(ns["vectors"][keep], dtype=np.float32)
+            ns["buffer"] = None
+            ns["positions"] = {vector_id: i for i, vector_id in enumerate(ns["ids"])}
+        return True
+
+    def query(self, vector, top_k=10, namespace="", filter=None, include_values=False, include_metadata=False, **kwargs):
+        """Same call and match fields (id, score, values, metadata) as Pinecone's Index.query"""
+        matches = [
+            SimpleNamespace(
+                id=vector_id,
+                score=score,
+                values=values.tolist() if include_values else [],
+                metadata=dict(metadata) if include_metadata else None
+            )
+            for vector_id, score, metadata, values in self._search(vector, top_k, filter, namespace)
+        ]
+        return SimpleNamespace(matches=matches, namespace=namespace)
+
+    def fetch(self, ids, namespace="", **kwargs):
+        """Stored vectors by ID, shaped like Pinecone's Index.fetch response; unknown IDs are left out"""
+        with self.lock:
+            ns = self._namespace(namespace)
+            positions = ns["positions"] if ns is not None else {}
+            vectors = {
+                vector_id: SimpleNamespace(
+                    id=vector_id,
+                    values=ns["vectors"][positions[vector_id]].tolist(),
+                    metadata=dict(ns["metadata"][positions[vector_id]])
+                )
+                for vector_id in ids if vector_id in positions
+            }
+        return SimpleNamespace(vectors=vectors, namespace=namespace)
+
+    def describe_index_stats(self):
+        with self.lock:
+            namespaces = {
+                name: SimpleNamespace(vector_count=len(ns["ids"]))
+                for name, ns in self.namespaces.items()
+            }
+        return SimpleNamespace(
+            namespaces=namespaces,
+            total_vector_count=sum(ns.vector_count for ns in namespaces.values())
+        )
+
+    # LangChain VectorStore interface
+
+    def add_texts(self, texts, metadatas=None, ids=None, namespace="", **kwargs):
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        vectors = self._embedding.embed_documents(texts)
+        self.upsert(
+            vectors=[
+                (vector_id, vector, {**metadata, self.text_key: text})
+                for vector_id, vector, metadata, text in zip(ids, vectors, metadatas, texts)
+            ],
+            namespace=namespace
+        )
+        return ids
+
+    def _search(self, embedding, k, filter=None, namespace=None):
+        """Return up to k (id, score, metadata, vector) tuples, best first"""
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        with self.lock:
+            ns = self._namespace(namespace)
+            if ns is None or not ns["ids"]:
+                return []
+            matrix = ns["vectors"]
+            scores = np.asarray(matrix @ query)
+            ids = ns["ids"]
+            metadata = ns["metadata"]
+
+        if filter:
+            allowed = np.array([_matches_filter(m, filter) for m in metadata], dtype=bool)
+            scores = np.where(allowed, scores, -np.inf)
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(ids[i], float(scores[i]), metadata[i], matrix[i]) for i in top if np.isfinite(scores[i])]
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, filter=None, namespace=None):
+        results = []
+        for vector_id, score, metadata, _ in self._search(embedding, k, filter, namespace):
+            doc_metadata = dict(metadata)
+            # The text key becomes page_content like PineconeVectorStore, but also stays in
+            # metadata since build_prompt() checks chunk_text there
+            text = doc_metadata.get(self.text_key, "")
+            results.append((Document(id=vector_id, page_content=text, metadata=doc_metadata), score))
+        return results
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, namespace=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter, namespace=namespace)]
+
+    def similarity_search_with_score(self, query, k=4, filter=None, namespace=None, **kwargs):
+        return self.similarity_search_by_vector_with_score(
+            self._embedding.embed_query(query), k=k, filter=filter, namespace=namespace
+        )
+
+    def similarity_search(self, query, k=4, filter=None, namespace=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter, namespace=namespace)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, namespace="", text_key="chunk_text", **kwargs):
+        store = cls(embedding=embedding, text_key=text_key)
+        store.add_texts(texts, metadatas=metadatas, ids=ids, namespace=namespace)
+        return store
+
+    # Persistence: one folder per namespace with records.json and the vectors file it names
+
+    def save(self, path):
+        """Write every namespace under path and remove folders of namespaces that no longer exist.
+
+        Each namespace gets a new, uniquely named vectors file, and records.json
+        (which names it) is swapped in with os.replace last. A crash mid-save
+        therefore leaves the previous records and vectors in place.
+        """
+        with self.lock:
+            os.makedirs(path, exist_ok=True)
+            for name in os.listdir(path):
+                folder = os.path.join(path, name)
+                if name not in self.namespaces and os.path.isfile(os.path.join(folder, "records.json")):
+                    shutil.rmtree(folder)
+
+            for name, ns in self.namespaces.items():
+                folder = os.path.join(path, name)
+                os.makedirs(folder, exist_ok=True)
+                vectors_file = f"vectors-{uuid.uuid4().hex}.npy"
+                with open(os.path.join(folder, vectors_file), "wb") as f:
+                    np.save(f, np.asarray(ns["vectors"], dtype=np.float32))
+                    f.flush()
+                    os.fsync(f.fileno())
+                records_path = os.path.join(folder, "records.json")
+                with open(records_path + ".tmp", "w", encoding="utf-8") as f:
+                    json.dump({"ids": ns["ids"], "metadata": ns["metadata"], "vectors": vectors_file}, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(records_path + ".tmp", records_path)
+
+                # Older vectors files, and any left behind by an interrupted save
+                for stale in os.listdir(folder):
+                    if stale.endswith(".npy") and stale != vectors_file:
+                        os.remove(os.path.join(folder, stale))
+
+    @classmethod
+    def load(cls, path, embedding=None, text_key="chunk_text", mmap=True):
+        store = cls(embedding=embedding, text_key=text_key)
+        if not os.path.isdir(path):
+            return store
+        for name in os.listdir(path):
+            folder = os.path.join(path, name)
+            records_path = os.path.join(folder, "records.json")
+            if not os.path.isfile(records_path):
+                continue
+            with open(records_path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+            # Stores saved before records.json named its vectors file used vectors.npy
+            vectors_path = os.path.join(folder, records.get("vectors", "vectors.npy"))
+            store.namespaces[name] = {
+                "ids": records["ids"],
+                "metadata": records["metadata"],
+                "vectors": np.load(vectors_path, mmap_mode="r" if mmap else None),
+                "positions": {vector_id: i for i, vector_id in enumerate(records["ids"])}
+            }
+        return store
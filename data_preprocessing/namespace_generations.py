@@ -0,0 +1,58 @@
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_GENERATIONS_PATH = os.getenv(
+    "NAMESPACE_GENERATIONS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "namespace_generations.sqlite")
+)
+# Readers re-check the file at least this often, in case two writes land within one mtime tick
+RECHECK_INTERVAL = 1.0
+
+
+class NamespaceGenerations:
+    """Per-namespace write counters shared between ingest jobs and the server.
+
+    Every upsert into a namespace bumps its generation, so caches that store
+    the generation with each entry can tell when it went stale. Reads are
+    served from memory and only go back to SQLite when the file changed.
+    """
+
+    def __init__(self, path=DEFAULT_GENERATIONS_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.generations = {}
+        self.file_state = None
+        self.checked_at = 0.0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Default rollback journal rather than WAL, so every commit touches the main file's mtime
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS generations (namespace TEXT PRIMARY KEY, generation INTEGER NOT NULL);")
+        self.conn.commit()
+
+    def _reload(self):
+        self.generations = dict(self.conn.execute("SELECT namespace, generation FROM generations;").fetchall())
+
+    def get(self, namespace):
+        now = time.monotonic()
+        with self.lock:
+            stat = os.stat(self.path)
+            state = (stat.st_mtime_ns, stat.st_size)
+            if state != self.file_state or now - self.checked_at > RECHECK_INTERVAL:
+                self._reload()
+                self.file_state = state
+                self.checked_at = now
+            return self.generations.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO generations (namespace, generation) VALUES (?, 1) "
+                "ON CONFLICT(namespace) DO UPDATE SET generation = generation + 1;",
+                (namespace,)
+            )
+            self.conn.commit()
+            self._reload()
+            return self.generations[namespace]
@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+ONNX_MODEL_DIR = os.getenv(
+    "ONNX_MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "onnx_models")
+)
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "1") == "1"
+# all-MiniLM-L6-v2 was trained on and truncates to 256 word pieces
+MAX_SEQ_LENGTH = 256
+ONNX_BATCH_SIZE = 32
+
+
+def model_dir(model_name, base=ONNX_MODEL_DIR):
+    return os.path.join(base, model_name.replace("/", "__"))
+
+
+def export_onnx(model_name, output_dir=None, quantize=ONNX_QUANTIZE):
+    """Export the transformer to ONNX, plus an int8 copy when quantize is set.
+
+    Only needs torch and transformers the first time; later calls find the
+    files in output_dir and return the model path straight away.
+    """
+    output_dir = output_dir or model_dir(model_name)
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    int8_path = os.path.join(output_dir, "model_int8.onnx")
+
+    if not os.path.exists(fp32_path):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        os.makedirs(output_dir, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name).eval()
+        inputs = tokenizer(["export"], return_tensors="pt")
+        input_names = ["input_ids", "attention_mask", "token_type_ids"]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(inputs[name] for name in input_names),
+                fp32_path,
+                input_names=input_names,
+                output_names=["last_hidden_state", "pooler_output"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14
+            )
+        # The fast tokenizer's tokenizer.json is all serving needs, without transformers
+        tokenizer.save_pretrained(output_dir)
+
+    if not quantize:
+        return fp32_path
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+
+class OnnxEmbeddings(Embeddings):
+    """Sentence-transformers style embeddings run with ONNX Runtime instead of PyTorch.
+
+    Mean-pools the last hidden state over the attention mask and L2-normalizes,
+    like the all-MiniLM-L6-v2 sentence-transformers pipeline. Serving only
+    needs onnxruntime and tokenizers; the model is exported on first use.
+    """
+
+    def __init__(self, model_name, quantize=ONNX_QUANTIZE, model_path=None, batch_size=ONNX_BATCH_SIZE, threads=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        path = model_path or export_onnx(model_name, quantize=quantize)
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.batch_size = batch_size
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(os.path.dirname(path), "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+    def _embed_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64)
+        }
+        hidden = self.session.run(["last_hidden_state"], {k: v for k, v in inputs.items() if k in self.input_names})[0]
+
+        mask = inputs["attention_mask"][:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).tolist()
+
+    def embed_documents(self, texts):
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed_batch(texts[i:i + self.batch_size]))
+        return vectors
+
+    def embed_query(self, text):
+        return self._embed_batch([text])[0]
@@ -1,24 +1,38 @@
 import os
 import fitz  # PyMuPDF
 import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from tqdm import tqdm
 
 # Suppress any warnings
 warnings.filterwarnings("ignore")
 
+# Large files are split into ranges of this many pages so one title can use several cores
+PAGES_PER_TASK = 200
+
+def iter_pages(pdf_path, start=0, end=None):
+    """Yield {"page_number", "text"} for each page with text, one page in memory at a time"""
+    with fitz.open(pdf_path) as pdf:
+        end = pdf.page_count if end is None else min(end, pdf.page_count)
+        for page_number in range(start, end):
+            page = pdf.load_page(page_number)
+            text = page.get_text("text")
+            if text:
+                yield {
+                    "page_number": page_number + 1,  # Pages are 1-indexed
+                    "text": text.strip().lower()
+                }
+
+def read_page_range(pdf_path, start, end):
+    return list(iter_pages(pdf_path, start, end))
+
+def get_page_count(pdf_path):
+    with fitz.open(pdf_path) as pdf:
+        return pdf.page_count
+
 def read_page(pdf_path):
-    texts = []
     try:
-        with fitz.open(pdf_path) as pdf:
-            for page_number in range(pdf.page_count):
-                page = pdf.load_page(page_number)
-                text = page.get_text("text")
-                if text:
-                    texts.append({
-                        "page_number": page_number + 1,  # Pages are 1-indexed
-                        "text": text.strip().lower()
-                    })
-        return texts
+        return read_page_range(pdf_path, 0, get_page_count(pdf_path))
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
         return ""
@@ -40,21 +54,83 @@ def store_text_to_file(texts, pdf_filename, processing_folder):
     else:
         print(f"No text to save for {pdf_filename}")
 
-def process_pdfs_in_folder(pdf_folder, output_folder):
+def process_pdfs_in_folder(pdf_folder, output_folder, workers=1, pages_per_task=PAGES_PER_TASK):
+    """Extract every PDF in pdf_folder to a [Page N] text file; returns a list of (filename, error) failures"""
     os.makedirs(output_folder, exist_ok=True)
 
     pdf_files = [f for f in os.listdir(pdf_folder) if f.endswith(".pdf")]
-    
+    if workers > 1:
+        return process_pdfs_in_parallel(pdf_folder, pdf_files, output_folder, workers, pages_per_task)
+
+    failures = []
     # Using tqdm to display a progress bar while processing PDFs
     for filename in tqdm(pdf_files, desc="Processing PDFs", unit="file"):
         pdf_path = os.path.join(pdf_folder, filename)
-        texts = read_page(pdf_path)
+        try:
+            texts = read_page_range(pdf_path, 0, get_page_count(pdf_path))
+        except Exception as e:
+            failures.append((filename, str(e)))
+            continue
         store_text_to_file(texts, filename, output_folder)
+    report_failures(failures)
+    return failures
+
+def process_pdfs_in_parallel(pdf_folder, pdf_files, output_folder, workers, pages_per_task):
+    failures = []
+    ranges = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Fan out over files and over page ranges of large files
+        futures = {}
+        total_pages = 0
+        for filename in pdf_files:
+            pdf_path = os.path.join(pdf_folder, filename)
+            try:
+                page_count = get_page_count(pdf_path)
+            except Exception as e:
+                failures.append((filename, str(e)))
+                continue
+            starts = range(0, page_count, pages_per_task)
+            ranges[filename] = {"expected": len(starts), "done": {}}
+            if not starts:
+                store_text_to_file([], filename, output_folder)
+            for start in starts:
+                end = min(start + pages_per_task, page_count)
+                futures[executor.submit(read_page_range, pdf_path, start, end)] = (filename, start, end)
+            total_pages += page_count
+
+        with tqdm(total=total_pages, desc="Processing PDFs", unit="page") as progress:
+            for future in as_completed(futures):
+                filename, start, end = futures[future]
+                progress.update(end - start)
+                state = ranges[filename]
+                if state is None:
+                    continue  # File already failed on another range
+                try:
+                    state["done"][start] = future.result()
+                except Exception as e:
+                    failures.append((filename, str(e)))
+                    ranges[filename] = None
+                    continue
+
+                # Reassemble in page order once every range of the file is back
+                if len(state["done"]) == state["expected"]:
+                    texts = [entry for s in sorted(state["done"]) for entry in state["done"][s]]
+                    store_text_to_file(texts, filename, output_folder)
+                    ranges[filename] = None
+
+    report_failures(failures)
+    return failures
+
+def report_failures(failures):
+    for filename, error in failures:
+        print(f"Failed to extract {filename}: {error}")
+    if failures:
+        print(f"{len(failures)} file(s) failed")
 
 def main():
     data_folder = "/content/drive/My Drive/DSCI560_Final/law_code"
     processing_folder = "/content/drive/My Drive/DSCI560_Final/processing_data"
-    process_pdfs_in_folder(data_folder, processing_folder)
+    process_pdfs_in_folder(data_folder, processing_folder, workers=os.cpu_count() or 1)
 
 
 if __name__ == "__main__":